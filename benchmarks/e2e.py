@@ -0,0 +1,196 @@
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+from collections import defaultdict
+
+from benchmarks.stand_in import StandIn, lognormal, start
+from smarthouse.base_client.histogram import Histogram
+from smarthouse.scenarios.light_scenarios import (
+    reconcile_states,
+    worker_check_and_run,
+    worker_run,
+    worker_run_batch,
+)
+from smarthouse.storage import Storage
+from smarthouse.yandex_client.client import YandexClient
+from smarthouse.yandex_client.device import HSVLamp, RunQueuesSet, run_async
+from smarthouse.yandex_client.queues import Lane
+
+MIX = {"button": 1, "motion": 3, "adaptive": 2, "random_colors": 4}
+
+
+class Tracer:
+    def __init__(self) -> None:
+        self.enqueued: dict[str, list[float]] = defaultdict(list)
+        self.posted: dict[str, float] = {}
+        self.actions = 0
+
+        self.enqueue_to_post = Histogram(size=100000)
+        self.post_to_verified = Histogram(size=100000)
+
+    def enqueue(self, device_ids: list[str]) -> None:
+        now = time.perf_counter()
+        for device_id in device_ids:
+            self.enqueued[device_id].append(now)
+        self.actions += len(device_ids)
+
+    def post(self, device_ids: list[str]) -> None:
+        now = time.perf_counter()
+        for device_id in device_ids:
+            for enqueued in self.enqueued.pop(device_id, []):
+                self.enqueue_to_post.add(now - enqueued)
+            self.posted[device_id] = now
+
+    def verified(self, device_ids: list[str]) -> None:
+        now = time.perf_counter()
+        for device_id in device_ids:
+            if (posted := self.posted.pop(device_id, None)) is not None:
+                self.post_to_verified.add(now - posted)
+
+
+def trace(ya_client: YandexClient, tracer: Tracer) -> None:
+    devices_action = ya_client._devices_action
+    check_devices_capabilities = ya_client._check_devices_capabilities
+
+    async def traced_devices_action(actions_list, *args, **kwargs):
+        tracer.post([action.device_id for action in actions_list])
+        return await devices_action(actions_list, *args, **kwargs)
+
+    async def traced_check_devices_capabilities(actions_list, *args, **kwargs):
+        result = await check_devices_capabilities(actions_list, *args, **kwargs)
+        tracer.verified([action.device_id for action in actions_list])
+        return result
+
+    ya_client._devices_action = traced_devices_action  # type: ignore[method-assign]
+    ya_client._check_devices_capabilities = traced_check_devices_capabilities  # type: ignore[method-assign]
+
+
+async def fire(scenario: str, lamps: list[HSVLamp], rnd: random.Random, tracer: Tracer) -> None:
+    if scenario == "button":
+        actions = [lamp.on_temp(4500, 100) for lamp in lamps[:4]]
+        tracer.enqueue([action.device_id for action in actions])
+        await run_async(actions, check=False, feature_checkable=True, lane=Lane.interactive)
+    elif scenario == "motion":
+        actions = [lamp.on_temp(3000, rnd.randint(30, 100)) for lamp in rnd.sample(lamps, 3)]
+        tracer.enqueue([action.device_id for action in actions])
+        await run_async(actions, lane=Lane.interactive)
+    elif scenario == "adaptive":
+        actions = [lamp.on_temp(rnd.randint(2700, 6500), rnd.randint(1, 70)) for lamp in lamps]
+        tracer.enqueue([action.device_id for action in actions])
+        await run_async(actions, lane=Lane.background)
+    elif scenario == "random_colors":
+        actions = [lamp.on_hsv((rnd.randint(0, 360), 100, 100), 50) for lamp in rnd.sample(lamps, 4)]
+        tracer.enqueue([action.device_id for action in actions])
+        await run_async(actions, lane=Lane.background)
+
+
+def git_version() -> str:
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def main(args: argparse.Namespace) -> dict:
+    rnd = random.Random(args.seed)
+    stand_in = StandIn(latency=lognormal(args.latency, rnd=rnd), error_rate=args.error_rate, seed=args.seed)
+    for i in range(args.lamps):
+        stand_in.add_lamp(f"lamp-{i}")
+    runner, base_url = await start(stand_in)
+
+    await Storage().init(storage_name=None)
+    ya_client = YandexClient()
+    ya_client.init(prod=True, base_url=base_url, keep_alive=args.keep_alive, write_through=args.write_through)
+    RunQueuesSet().init(batch_window=args.batch_window)
+    lamps = [HSVLamp(f"lamp-{i}", f"lamp-{i}") for i in range(args.lamps)]
+
+    tracer = Tracer()
+    trace(ya_client, tracer)
+
+    if args.batch_window is None:
+        workers = [asyncio.create_task(worker_run()) for _ in range(args.workers)]
+    else:
+        workers = [asyncio.create_task(worker_run_batch()) for _ in range(args.workers)]
+    workers += [asyncio.create_task(worker_check_and_run()) for _ in range(args.workers)]
+    if args.write_through:
+        workers.append(asyncio.create_task(reconcile_states()))
+
+    mix = dict(MIX, **dict((item.split("=")[0], int(item.split("=")[1])) for item in args.mix or []))
+    scenarios = [scenario for scenario, weight in mix.items() for _ in range(weight)]
+
+    start_time = time.perf_counter()
+    fired = 0
+    while time.perf_counter() - start_time < args.duration:
+        await fire(rnd.choice(scenarios), lamps, rnd, tracer)
+        fired += 1
+        await asyncio.sleep(rnd.expovariate(args.rate))
+    try:
+        await asyncio.wait_for(RunQueuesSet().run.join(), timeout=30)
+        await asyncio.wait_for(ya_client._reconcile_queue.join(), timeout=30)
+    except asyncio.TimeoutError:
+        pass
+    elapsed = time.perf_counter() - start_time
+
+    for worker in workers:
+        worker.cancel()
+    await ya_client.client.close()
+    await ya_client.china_client.close()
+    await runner.cleanup()
+
+    return {
+        "version": git_version(),
+        "timestamp": time.time(),
+        "config": vars(args),
+        "results": {
+            "fired": fired,
+            "actions": tracer.actions,
+            "actions_per_second": round(tracer.actions / elapsed, 1),
+            "enqueue_to_post": tracer.enqueue_to_post.summary(),
+            "post_to_verified": tracer.post_to_verified.summary(),
+            "api_calls": dict(stand_in.calls),
+            "api_calls_per_action": round(sum(stand_in.calls.values()) / max(1, tracer.actions), 3),
+            "superseded": RunQueuesSet().run.superseded,
+        },
+    }
+
+
+def compare(previous: dict, current: dict) -> None:
+    for metric in ("enqueue_to_post", "post_to_verified"):
+        for quantile in ("p50", "p95", "p99"):
+            old = previous["results"][metric][quantile]
+            new = current["results"][metric][quantile]
+            change = (new - old) / old * 100 if old else 0.0
+            print(f"{metric} {quantile}: {old} -> {new} ({change:+.1f}%)")
+    for metric in ("actions_per_second", "api_calls_per_action"):
+        print(f"{metric}: {previous['results'][metric]} -> {current['results'][metric]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--rate", type=float, default=20, help="scenario firings per second")
+    parser.add_argument("--lamps", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.05, help="median API latency")
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--batch-window", type=float, default=None)
+    parser.add_argument("--keep-alive", action="store_true")
+    parser.add_argument("--write-through", action="store_true")
+    parser.add_argument("--mix", nargs="*", help="scenario=weight, e.g. motion=5 button=1")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="e2e_results.json")
+    parser.add_argument("--compare", help="previous results JSON to compare with")
+    args = parser.parse_args()
+
+    result = asyncio.run(main(args))
+    print(json.dumps(result["results"], indent=2))
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    if args.compare is not None:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), result)
@@ -0,0 +1,58 @@
+import argparse
+import asyncio
+import time
+
+from benchmarks.stand_in import StandIn, start
+from smarthouse.base_client.histogram import Histogram
+from smarthouse.yandex_client.client import YandexClient
+
+
+async def measure(base_url: str, keep_alive: bool, requests: int, concurrency: int) -> dict:
+    ya_client = YandexClient()
+    ya_client.init(prod=True, keep_alive=keep_alive, limit_per_host=concurrency, base_url=base_url)
+    await ya_client.warm_up()
+
+    latencies = Histogram(size=requests)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await ya_client._request("GET", f"/devices/lamp-{i % 10}")
+            latencies.add(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(requests)])
+    elapsed = time.perf_counter() - start
+
+    await ya_client.client.close()
+    await ya_client.china_client.close()
+    return {
+        "keep_alive": keep_alive,
+        "rps": round(requests / elapsed, 1),
+        "latency": latencies.summary(),
+        "connections": dict(ya_client._connection_stats),
+    }
+
+
+async def main(requests: int, concurrency: int, latency: float, handshake_latency: float) -> None:
+    stand_in = StandIn(latency=latency, handshake_latency=handshake_latency)
+    for i in range(10):
+        stand_in.add_lamp(f"lamp-{i}")
+    runner, base_url = await start(stand_in)
+
+    try:
+        for keep_alive in (False, True):
+            print(await measure(base_url, keep_alive, requests, concurrency))
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--handshake-latency", type=float, default=0.05)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.latency, args.handshake_latency))
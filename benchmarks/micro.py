@@ -0,0 +1,139 @@
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import tempfile
+import time
+from typing import Awaitable, Callable
+
+from benchmarks.stand_in import load_mock
+from smarthouse.action_decorators import calc_sleep
+from smarthouse.base_client.gap_stat import GapStat
+from smarthouse.storage import Storage
+from smarthouse.yandex_client.client import YandexClient
+from smarthouse.yandex_client.device import yandex_big_lamp_mutation
+from smarthouse.yandex_client.models import DeviceCapabilityAction, DeviceInfoResponse, StateItem
+from smarthouse.yandex_client.utils import get_current_capabilities
+
+SIZES = (10, 100, 1000)
+
+
+def measure(func: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+async def ameasure(func: Callable[[], Awaitable[object]], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def lamp_response(device_id: str) -> dict:
+    response = load_mock("lamp_response.json")
+    response["id"] = device_id
+    for item in response["capabilities"] + response["properties"]:
+        item["last_updated"] = time.time()
+    return response
+
+
+def prepare_client(size: int) -> tuple[YandexClient, list[DeviceCapabilityAction], list[dict]]:
+    ya_client = YandexClient()
+    ya_client.init(prod=True)
+    responses = [lamp_response(f"lamp-{i}") for i in range(size)]
+    actions_list = []
+    for response in responses:
+        device_id = response["id"]
+        ya_client.register_device(device_id, device_id)
+        action = DeviceCapabilityAction(
+            device_id=device_id, capabilities=[("on_off", "on", False), ("range", "brightness", 70)]
+        )
+        actions_list.append(action)
+        ya_client.states_set(device_id, StateItem(actions_list=[action]))
+        ya_client.locks_set(device_id, time.time() + 3600, level=5)
+        ya_client._cache.set(device_id, DeviceInfoResponse(**response), timestamp=time.time() + 3600)
+    return ya_client, actions_list, responses
+
+
+async def run(size: int, repeat: int) -> list[dict]:
+    ya_client, actions_list, responses = prepare_client(size)
+    devices = [DeviceInfoResponse(**response) for response in responses]
+    gap_stats = [GapStat() for _ in range(size)]
+    intervals = [(datetime.timedelta(hours=10), lambda: datetime.timedelta(hours=22))] * size
+
+    with open("./storage/micro.yaml", "w", encoding="utf-8") as f:
+        f.write("init: true\n")
+    storage = Storage()
+    await storage.init(storage_name="micro.yaml")
+    for i in range(size):
+        storage.put(f"key_{i}", {"value": i, "items": list(range(10))})
+
+    async def write_storage():
+        await storage._write_storage(force=True)
+
+    cases: list[tuple[str, float]] = [
+        ("GapStat.add", measure(lambda: [gap_stat.add(True) for gap_stat in gap_stats], repeat)),
+        ("GapStat.stats", measure(lambda: [gap_stat.stats(False) for gap_stat in gap_stats], repeat)),
+        (
+            "BaseClient.ask_permissions",
+            await ameasure(
+                lambda: ya_client.ask_permissions([(action.device_id, None) for action in actions_list]), repeat
+            ),
+        ),
+        (
+            "YandexClient._check_devices_capabilities",
+            await ameasure(lambda: ya_client._check_devices_capabilities(actions_list, real_action=False), repeat),
+        ),
+        ("get_current_capabilities", measure(lambda: [get_current_capabilities(device) for device in devices], repeat)),
+        ("yandex_big_lamp_mutation", measure(lambda: [yandex_big_lamp_mutation(a) for a in actions_list], repeat)),
+        (
+            "Storage.put",
+            measure(lambda: [storage.put(f"key_{i}", {"value": -i, "items": []}) for i in range(size)], repeat),
+        ),
+        ("Storage._write_storage", await ameasure(write_storage, repeat)),
+        ("DeviceInfoResponse parse", measure(lambda: [DeviceInfoResponse(**r) for r in responses], repeat)),
+        ("calc_sleep", measure(lambda: [calc_sleep(interval) for interval in intervals], repeat)),
+    ]
+    await ya_client.client.close()
+    await ya_client.china_client.close()
+    return [
+        {"name": name, "size": size, "per_tick_ms": round(best * 1000, 4), "per_item_us": round(best / size * 1e6, 3)}
+        for name, best in cases
+    ]
+
+
+async def main(sizes: list[int], repeat: int) -> list[dict]:
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        cwd = os.getcwd()
+        os.chdir(directory)
+        os.mkdir("storage")
+        try:
+            for size in sizes:
+                results += await run(size, repeat)
+        finally:
+            os.chdir(cwd)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="*", default=list(SIZES))
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(main(args.sizes, args.repeat))
+    for result in results:
+        print(f"{result['name']:45} {result['size']:>6} {result['per_tick_ms']:>12} ms {result['per_item_us']:>10} us")
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,108 @@
+import argparse
+import asyncio
+import json
+import time
+
+import aiohttp
+from aiohttp import web
+
+from benchmarks.stand_in import load_mock
+from smarthouse.base_client.histogram import Histogram
+from smarthouse.yandex_client.client import YandexClient
+from smarthouse.yandex_client.models import DeviceInfoResponse
+from smarthouse.yandex_client.push import push_routes
+
+PATH = "/yandex/callback/state"
+TOKEN = "bench"
+
+
+def synthesize(devices: int, count: int) -> list[dict]:
+    callbacks = []
+    for i in range(count):
+        callbacks.append(
+            {
+                "ts": time.time() + i,
+                "payload": {
+                    "user_id": "replay",
+                    "devices": [
+                        {
+                            "id": f"sensor-{i % devices}",
+                            "properties": [
+                                {
+                                    "type": "devices.properties.event",
+                                    "state": {"instance": "motion", "value": "detected"},
+                                }
+                            ],
+                            "capabilities": [
+                                {
+                                    "type": "devices.capabilities.on_off",
+                                    "state": {"instance": "on", "value": i % 2 == 0},
+                                }
+                            ],
+                        }
+                    ],
+                },
+            }
+        )
+    return callbacks
+
+
+def load(file: str) -> list[dict]:
+    with open(file, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+async def main(file: str | None, devices: int, count: int, concurrency: int) -> None:
+    ya_client = YandexClient()
+    ya_client.init(prod=True)
+    lamp = load_mock("lamp_response.json")
+    for i in range(devices):
+        ya_client._on_device_info(f"sensor-{i}", DeviceInfoResponse(**(lamp | {"id": f"sensor-{i}"})))
+
+    callbacks = load(file) if file is not None else synthesize(devices, count)
+
+    app = web.Application()
+    app.add_routes(push_routes(TOKEN, PATH))
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+
+    latencies = Histogram(size=len(callbacks))
+    payloads = iter(callbacks)
+    headers = {"Authorization": f"Bearer {TOKEN}"}
+    async with aiohttp.ClientSession(f"http://127.0.0.1:{port}", headers=headers) as session:
+
+        async def replay() -> None:
+            for callback in payloads:
+                start = time.perf_counter()
+                async with session.post(PATH, json=callback) as response:
+                    response.raise_for_status()
+                latencies.add(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[replay() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+
+    await runner.cleanup()
+
+    print(
+        {
+            "callbacks": len(callbacks),
+            "callbacks_per_second": round(len(callbacks) / elapsed, 1),
+            "latency": latencies.summary(),
+            "push": ya_client._push_stats,
+            "events": ya_client.events.stats(),
+        }
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file", help="JSON lines file with recorded callbacks")
+    parser.add_argument("--devices", type=int, default=50)
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.file, args.devices, args.count, args.concurrency))
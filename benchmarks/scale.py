@@ -0,0 +1,180 @@
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import time
+import tracemalloc
+from typing import Awaitable, Callable
+
+from benchmarks.stand_in import StandIn, lognormal, start
+from smarthouse.base_client.histogram import Histogram
+from smarthouse.scenarios.light_scenarios import ping_devices
+from smarthouse.scenarios.system_scenarios import clear_quarantine, detect_human
+from smarthouse.storage import Storage
+from smarthouse.yandex_client.client import YandexClient
+from smarthouse.yandex_client.models import DeviceCapabilityAction, StateItem
+from smarthouse.yandex_client.utils import get_current_capabilities
+
+SIZES = (100, 1000, 3000)
+
+LOOPERS: dict[str, Callable[[], Awaitable[object]]] = {
+    "ping_devices": ping_devices._original,
+    "clear_quarantine": clear_quarantine._original,
+    "detect_human": detect_human._original,
+}
+
+
+class LagProbe:
+    def __init__(self, interval: float = 0.01) -> None:
+        self.interval = interval
+        self.lags = Histogram(size=100000)
+        self._task: asyncio.Task | None = None
+
+    async def _run(self) -> None:
+        while True:
+            start_time = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.add(time.perf_counter() - start_time - self.interval)
+
+    def start(self) -> None:
+        self.lags.reset()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> dict:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        return self.lags.summary()
+
+
+async def populate(ya_client: YandexClient, device_ids: list[str], concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(device_id: str) -> None:
+        async with semaphore:
+            device_info = await ya_client.device_info(device_id, hash_seconds=None)
+        if device_info is not None:
+            ya_client.states_set(
+                device_id,
+                StateItem(
+                    actions_list=[
+                        DeviceCapabilityAction(
+                            device_id=device_id, capabilities=get_current_capabilities(device_info) or []
+                        )
+                    ],
+                    excl=(),
+                    checked=True,
+                    mutated=True,
+                ),
+            )
+
+    await asyncio.gather(*[fetch(device_id) for device_id in device_ids])
+
+
+async def cycle(name: str, stand_in: StandIn, probe: LagProbe, max_cycle: float, devices: int) -> dict[str, object]:
+    stand_in.calls.clear()
+    probe.start()
+    start_time = time.perf_counter()
+    completed = True
+    try:
+        await asyncio.wait_for(LOOPERS[name](), timeout=max_cycle)
+    except asyncio.TimeoutError:
+        completed = False
+    elapsed = time.perf_counter() - start_time
+    lag = await probe.stop()
+
+    calls = sum(stand_in.calls.values())
+    probed = sum(count for call, count in stand_in.calls.items() if call.startswith("GET /v1.0/devices/"))
+    result: dict[str, object] = {
+        "completed": completed,
+        "cycle_seconds": round(elapsed, 3),
+        "api_calls": calls,
+        "api_calls_per_minute": round(calls / elapsed * 60, 1) if elapsed else 0.0,
+        "loop_lag": lag,
+    }
+    if not completed:
+        result["estimated_cycle_seconds"] = round(elapsed / probed * devices, 1) if probed else None
+    return result
+
+
+async def run(size: int, args: argparse.Namespace) -> dict:
+    stand_in = StandIn(latency=lognormal(args.latency), seed=args.seed)
+    device_ids = [f"lamp-{i}" for i in range(size)]
+    for device_id in device_ids:
+        stand_in.add_lamp(device_id)
+    quarantined = device_ids[: int(size * args.quarantined)]
+    stand_in.offline.update(quarantined)
+    runner, base_url = await start(stand_in)
+
+    await Storage().init(storage_name=None)
+    ya_client = YandexClient()
+
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    ya_client.init(prod=True, base_url=base_url, keep_alive=True, limit_per_host=args.concurrency)
+    for device_id in device_ids:
+        ya_client.register_device(device_id, device_id)
+    await populate(ya_client, device_ids, args.concurrency)
+    gc.collect()
+    memory = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    probe = LagProbe(args.lag_interval)
+    loopers = {}
+    for name in LOOPERS:
+        if args.cold or name == "ping_devices":
+            ya_client._cache.clear()
+        loopers[name] = await cycle(name, stand_in, probe, args.max_cycle, size)
+
+    await ya_client.client.close()
+    await ya_client.china_client.close()
+    await runner.cleanup()
+
+    return {
+        "devices": size,
+        "quarantined": len(ya_client.quarantine_ids()),
+        "checked_states": len(list(ya_client.states_keys())),
+        "memory_per_device_kb": round(memory / size / 1024, 2),
+        "loopers": loopers,
+        "ping": ya_client.pinger.stats(),
+    }
+
+
+async def main(args: argparse.Namespace) -> list[dict]:
+    return [await run(size, args) for size in args.sizes]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="*", default=list(SIZES))
+    parser.add_argument("--latency", type=float, default=0.02, help="median API latency")
+    parser.add_argument("--quarantined", type=float, default=0.05, help="share of devices that are offline")
+    parser.add_argument("--concurrency", type=int, default=20, help="parallel requests while populating")
+    parser.add_argument("--max-cycle", type=float, default=30, help="cap for a single looper cycle")
+    parser.add_argument(
+        "--cold", action="store_true", help="drop the device cache before every cycle, not only before ping_devices"
+    )
+    parser.add_argument("--lag-interval", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    logging.getLogger("root").disabled = True
+    results = asyncio.run(main(args))
+    for result in results:
+        print(
+            f"{result['devices']:>6} devices, {result['memory_per_device_kb']} KB/device, "
+            f"{result['quarantined']} quarantined, {result['checked_states']} checked states"
+        )
+        for name, looper_result in result["loopers"].items():
+            cycle_seconds = looper_result.get("estimated_cycle_seconds", looper_result["cycle_seconds"])
+            print(
+                f"    {name:18} cycle {cycle_seconds:>8} s{'' if looper_result['completed'] else ' (est.)'}"
+                f"  {looper_result['api_calls_per_minute']:>8} calls/min"
+                f"  lag p99 {looper_result['loop_lag']['p99']}"
+            )
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
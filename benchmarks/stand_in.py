@@ -0,0 +1,251 @@
+import asyncio
+import copy
+import json
+import os
+import random
+import time
+import uuid
+from collections import Counter
+from typing import Any, Callable
+
+from aiohttp import web
+
+MOCK_DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "mock_data")
+
+EVENT_INSTANCES = {"motion", "open", "button"}
+
+
+def load_mock(name: str) -> dict:
+    with open(os.path.join(MOCK_DATA, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def constant(value: float) -> Callable[[], float]:
+    return lambda: value
+
+
+def uniform(low: float, high: float, rnd: random.Random | None = None) -> Callable[[], float]:
+    rnd = rnd or random.Random()
+    return lambda: rnd.uniform(low, high)
+
+
+def lognormal(median: float, sigma: float = 0.5, rnd: random.Random | None = None) -> Callable[[], float]:
+    rnd = rnd or random.Random()
+    return lambda: median * rnd.lognormvariate(0, sigma)
+
+
+def property_item(instance: str, value: Any, last_updated: float | None = None) -> dict:
+    return {
+        "type": "devices.properties.event" if instance in EVENT_INSTANCES else "devices.properties.float",
+        "reportable": True,
+        "retrievable": instance not in EVENT_INSTANCES,
+        "parameters": {"instance": instance},
+        "state": {"instance": instance, "value": value},
+        "last_updated": last_updated if last_updated is not None else time.time(),
+    }
+
+
+class StandIn:
+    def __init__(
+        self,
+        latency: float | Callable[[], float] = 0.005,
+        handshake_latency: float = 0,
+        error_rate: float = 0,
+        timeout_rate: float = 0,
+        timeout: float = 10,
+        seed: int | None = None,
+    ) -> None:
+        self.random = random.Random(seed)
+        self.latency = latency if callable(latency) else constant(latency)
+        self.handshake_latency = handshake_latency
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.timeout = timeout
+
+        self.devices: dict[str, dict] = {}
+        self.groups: dict[str, dict] = {}
+        self.scenarios: dict[str, dict] = {}
+        self.offline: set[str] = set()
+        self.calls: Counter[str] = Counter()
+        self.faults: list[dict] = []
+
+        self._lamp = load_mock("lamp_response.json")
+        self._peers: set = set()
+
+    def add_lamp(self, device_id: str, name: str = "") -> dict:
+        device = copy.deepcopy(self._lamp)
+        for key in ("status", "request_id", "state"):
+            device.pop(key, None)
+        device.update({"id": device_id, "name": name or device_id, "groups": [], "properties": []})
+        for capability in device["capabilities"]:
+            capability["last_updated"] = time.time()
+        self.devices[device_id] = device
+        return device
+
+    def add_sensor(self, device_id: str, properties: dict[str, Any], name: str = "") -> dict:
+        device = self.add_lamp(device_id, name)
+        device.update(
+            {
+                "type": "devices.types.sensor",
+                "capabilities": [],
+                "properties": [property_item(instance, value) for instance, value in properties.items()],
+            }
+        )
+        return device
+
+    def add_group(self, group_id: str, device_ids: list[str], name: str = "") -> dict:
+        group = {"id": group_id, "name": name or group_id, "devices": device_ids}
+        self.groups[group_id] = group
+        for device_id in device_ids:
+            self.devices[device_id]["groups"].append(group_id)
+        return group
+
+    def add_scenario(self, scenario_id: str, actions: list[tuple[str, list[dict]]], name: str = "") -> dict:
+        scenario = {"id": scenario_id, "name": name or scenario_id, "actions": actions, "is_active": True}
+        self.scenarios[scenario_id] = scenario
+        return scenario
+
+    def set_property(self, device_id: str, instance: str, value: Any) -> None:
+        for item in self.devices[device_id]["properties"]:
+            if item["parameters"]["instance"] == instance:
+                item["state"]["value"] = value
+                item["last_updated"] = time.time()
+
+    def capability(self, device_id: str, capability_type: str) -> dict | None:
+        for capability in self.devices[device_id]["capabilities"]:
+            if capability["type"] == capability_type:
+                return capability["state"]
+        return None
+
+    def inject(self, path: str = "/", fault: int | str = 500, count: int = 1) -> None:
+        self.faults.append({"path": path, "fault": fault, "count": count})
+
+    def _take_fault(self, path: str) -> int | str | None:
+        for fault in self.faults:
+            if path.startswith(fault["path"]) and fault["count"] > 0:
+                fault["count"] -= 1
+                return fault["fault"]
+        if self.timeout_rate and self.random.random() < self.timeout_rate:
+            return "timeout"
+        if self.error_rate and self.random.random() < self.error_rate:
+            return 500
+        return None
+
+    def _device_state(self, device_id: str) -> dict:
+        return self.devices[device_id] | {"state": "offline" if device_id in self.offline else "online"}
+
+    def _apply(self, device_id: str, actions: list[dict]) -> list[dict]:
+        results = []
+        for action in actions:
+            status: dict[str, Any] = {"status": "DONE"}
+            if device_id not in self.devices:
+                status = {"status": "ERROR", "error_code": "DEVICE_NOT_FOUND", "error_message": "not found"}
+            elif device_id in self.offline:
+                status = {"status": "ERROR", "error_code": "DEVICE_UNREACHABLE", "error_message": "unreachable"}
+            else:
+                for capability in self.devices[device_id]["capabilities"]:
+                    if capability["type"] == action["type"]:
+                        capability["state"] = {
+                            "instance": action["state"]["instance"],
+                            "value": action["state"]["value"],
+                        }
+                        capability["last_updated"] = time.time()
+            results.append(
+                {"type": action["type"], "state": {"instance": action["state"]["instance"], "action_result": status}}
+            )
+        return results
+
+    def app(self) -> web.Application:
+        @web.middleware
+        async def emulate_network(request: web.Request, handler):
+            resource = request.match_info.route.resource
+            self.calls[f"{request.method} {resource.canonical if resource is not None else request.path}"] += 1
+            peer = request.transport.get_extra_info("peername") if request.transport is not None else None
+            if peer not in self._peers:
+                self._peers.add(peer)
+                await asyncio.sleep(self.handshake_latency)
+            await asyncio.sleep(self.latency())
+
+            fault = self._take_fault(request.path)
+            if fault == "timeout":
+                await asyncio.sleep(self.timeout)
+            elif isinstance(fault, int):
+                return web.json_response({"status": "error", "message": f"injected {fault}"}, status=fault)
+            return await handler(request)
+
+        def ok(data: dict | None = None) -> web.Response:
+            return web.json_response({"status": "ok", "request_id": str(uuid.uuid4())} | (data or {}))
+
+        def not_found(message: str) -> web.Response:
+            return web.json_response({"status": "error", "message": message}, status=404)
+
+        async def root(request: web.Request) -> web.Response:
+            return web.Response()
+
+        async def device_info(request: web.Request) -> web.Response:
+            if (device_id := request.match_info["device_id"]) not in self.devices:
+                return not_found(f"device {device_id} not found")
+            return ok(self._device_state(device_id))
+
+        async def devices_actions(request: web.Request) -> web.Response:
+            data = json.loads(await request.text())
+            return ok(
+                {
+                    "devices": [
+                        {"id": device["id"], "capabilities": self._apply(device["id"], device["actions"])}
+                        for device in data["devices"]
+                    ]
+                }
+            )
+
+        async def user_info(request: web.Request) -> web.Response:
+            return ok(
+                {
+                    "rooms": [],
+                    "groups": list(self.groups.values()),
+                    "devices": [self._device_state(device_id) for device_id in self.devices],
+                    "scenarios": [
+                        {"id": scenario["id"], "name": scenario["name"], "is_active": scenario["is_active"]}
+                        for scenario in self.scenarios.values()
+                    ],
+                }
+            )
+
+        async def group_info(request: web.Request) -> web.Response:
+            if (group := self.groups.get(request.match_info["group_id"])) is None:
+                return not_found("group not found")
+            return ok(group | {"devices": [self._device_state(device_id) for device_id in group["devices"]]})
+
+        async def group_actions(request: web.Request) -> web.Response:
+            if (group := self.groups.get(request.match_info["group_id"])) is None:
+                return not_found("group not found")
+            data = json.loads(await request.text())
+            for device_id in group["devices"]:
+                self._apply(device_id, data["actions"])
+            return ok()
+
+        async def scenario_actions(request: web.Request) -> web.Response:
+            if (scenario := self.scenarios.get(request.match_info["scenario_id"])) is None:
+                return not_found("scenario not found")
+            for device_id, actions in scenario["actions"]:
+                self._apply(device_id, actions)
+            return ok()
+
+        app = web.Application(middlewares=[emulate_network])
+        app.router.add_route("*", "/", root)
+        app.router.add_get("/v1.0/devices/{device_id}", device_info)
+        app.router.add_post("/v1.0/devices/actions", devices_actions)
+        app.router.add_get("/v1.0/user/info", user_info)
+        app.router.add_get("/v1.0/groups/{group_id}", group_info)
+        app.router.add_post("/v1.0/groups/{group_id}/actions", group_actions)
+        app.router.add_post("/v1.0/scenarios/{scenario_id}/actions", scenario_actions)
+        return app
+
+
+async def start(stand_in: StandIn, host: str = "127.0.0.1", port: int = 0) -> tuple[web.AppRunner, str]:
+    runner = web.AppRunner(stand_in.app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+    return runner, f"http://{host}:{port}"
@@ -0,0 +1,140 @@
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import yaml
+
+from benchmarks.scale import LagProbe
+from smarthouse.storage import Storage
+from smarthouse.storage_backends import FORMATS
+
+SIZES = (100, 1000, 10000)
+BACKENDS = ("file", "journal", "sqlite")
+FORMAT_SIZES = (1000, 10000, 100000)
+
+
+def value(i: int) -> dict:
+    return {"value": i, "timestamp": time.time(), "items": list(range(10))}
+
+
+async def run(backend: str, size: int, changed: int, flushes: int) -> dict:
+    for name in os.listdir("./storage"):
+        os.remove(os.path.join("./storage", name))
+    with open("./storage/bench.yaml", "w", encoding="utf-8") as f:
+        f.write(yaml.dump({f"key_{i}": value(i) for i in range(size)}))
+    storage_name = "bench.sqlite" if backend == "sqlite" else "bench.yaml"
+    storage = Storage()
+    await storage.init(storage_name=storage_name, backend=backend)
+    assert storage._backend is not None
+    storage._backend.reset_stats()
+
+    blocked = []
+    probe = LagProbe(0.001)
+    probe.start()
+    for flush in range(flushes):
+        for i in range(changed):
+            storage.put(f"key_{(flush * changed + i) % size}", value(-i))
+        start = time.perf_counter()
+        await storage._write_storage()
+        blocked.append(time.perf_counter() - start)
+    lag = await probe.stop()
+    stats = storage._backend.stats()
+
+    probe.start()
+    start = time.perf_counter()
+    await storage.init(storage_name=storage_name, backend=backend)
+    init_time = time.perf_counter() - start
+    init_lag = await probe.stop()
+    await storage.init(storage_name=None)
+    return {
+        "backend": backend,
+        "size": size,
+        "changed": changed,
+        "flush_ms": round(sum(blocked) / len(blocked) * 1000, 3),
+        "max_flush_ms": round(max(blocked) * 1000, 3),
+        "flush_stall_ms": round(lag["max"] * 1000, 3),
+        "init_ms": round(init_time * 1000, 3),
+        "init_stall_ms": round(init_lag["max"] * 1000, 3),
+        "bytes_per_flush": stats["bytes_written"] // flushes,
+        "stats": stats,
+    }
+
+
+def run_format(name: str, size: int) -> dict:
+    storage_format = FORMATS[name]()
+    data = {f"key_{i}": value(i) for i in range(size)}
+    start = time.perf_counter()
+    content = storage_format.dump(data)
+    dump_time = time.perf_counter() - start
+    start = time.perf_counter()
+    storage_format.load(content)
+    load_time = time.perf_counter() - start
+    return {
+        "format": name,
+        "size": size,
+        "dump_ms": round(dump_time * 1000, 1),
+        "load_ms": round(load_time * 1000, 1),
+        "bytes": len(content),
+    }
+
+
+def main_formats(args: argparse.Namespace) -> list[dict]:
+    results = []
+    for name in FORMATS:
+        for size in args.sizes or FORMAT_SIZES:
+            try:
+                results.append(run_format(name, size))
+            except ImportError as exc:
+                print(f"{name}: {exc}")
+                break
+    return results
+
+
+async def main(args: argparse.Namespace) -> list[dict]:
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        cwd = os.getcwd()
+        os.chdir(directory)
+        os.mkdir("storage")
+        try:
+            for backend in args.backends:
+                for size in args.sizes or SIZES:
+                    results.append(await run(backend, size, args.changed, args.flushes))
+        finally:
+            os.chdir(cwd)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="*", default=list(BACKENDS))
+    parser.add_argument("--sizes", type=int, nargs="*")
+    parser.add_argument("--changed", type=int, default=2, help="keys changed between flushes")
+    parser.add_argument("--flushes", type=int, default=20)
+    parser.add_argument("--formats", action="store_true", help="compare storage formats instead of backends")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    if args.formats:
+        results = main_formats(args)
+        for result in results:
+            print(
+                f"{result['format']:8} {result['size']:>7} keys  dump {result['dump_ms']:>9} ms"
+                f"  load {result['load_ms']:>9} ms  {result['bytes']:>10} bytes"
+            )
+    else:
+        results = asyncio.run(main(args))
+        for result in results:
+            print(
+                f"{result['backend']:8} {result['size']:>7} keys {result['changed']:>4} changed"
+                f"  flush {result['flush_ms']:>9} ms (max {result['max_flush_ms']:>9},"
+                f" stall {result['flush_stall_ms']:>9})"
+                f"  init {result['init_ms']:>9} ms (stall {result['init_stall_ms']:>9})"
+                f"  {result['bytes_per_flush']:>10} bytes/flush"
+            )
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
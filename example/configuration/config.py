@@ -10,6 +10,18 @@ class Config(BaseSettings):
     storage_name: str = "storage.yaml"
     s3_mode: bool = False
     iam_mode: bool = False
+    snapshot_mode: bool = False
+    write_through: bool = False
+    batch_window: float | None = None
+    keep_alive: bool = False
+    get_rate: float = 100
+    post_rate: float = 50
+    adaptive_polling: bool = False
+    ping_concurrency: int = 10
+    storage_backend: str = "file"
+    storage_format: str | None = None
+    push_path: str | None = None
+    push_token: str | None = None
 
     yandex_token: str
 
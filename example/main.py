@@ -65,6 +65,18 @@ async def main():
         s3_mode=config.s3_mode,
         iam_mode=config.iam_mode,
         aiohttp_routes=routes,
+        snapshot_mode=config.snapshot_mode,
+        write_through=config.write_through,
+        batch_window=config.batch_window,
+        keep_alive=config.keep_alive,
+        get_rate=config.get_rate,
+        post_rate=config.post_rate,
+        adaptive_polling=config.adaptive_polling,
+        ping_concurrency=config.ping_concurrency,
+        storage_backend=config.storage_backend,
+        storage_format=config.storage_format,
+        push_path=config.push_path,
+        push_token=config.push_token,
     )
 
     await app.prepare()
@@ -28,6 +28,7 @@ from smarthouse.storage_keys import SysSKeys
 from smarthouse.utils import MIN, get_time, get_timedelta_now, hsv_to_rgb
 from smarthouse.yandex_client.client import YandexClient
 from smarthouse.yandex_client.device import HSVLamp, RGBLamp, TemperatureLamp, run_async
+from smarthouse.yandex_client.queues import Lane
 
 
 @looper(1)
@@ -86,7 +87,7 @@ async def random_colors_scenario(
                             lamp.on_temp(temperature_k=possible_colors[i][1], brightness=possible_colors[i][0])
                         )
 
-        await run_async(actions)
+        await run_async(actions, lane=Lane.background)
 
         if len(lamp_groups) > 1:
             return random.randint(*rand)
@@ -131,7 +132,7 @@ async def button_scenario():
 
         if state_button == "double_click":
             lamps_to_off = set(ds.all_lamps) - set(lamp for mode in ds.lamp_groups for lamp in mode)
-            await run_async([lamp.off() for lamp in lamps_to_off])
+            await run_async([lamp.off() for lamp in lamps_to_off], lane=Lane.interactive)
 
             if not storage.get(SKeys.random_colors):
                 storage.put(SKeys.random_colors_mode, 0)
@@ -146,7 +147,7 @@ async def button_scenario():
             if datetime.timedelta(hours=10) < get_timedelta_now() < calc_sunset():
                 storage.put(SKeys.adaptive_locked, True)
                 storage.put(SKeys.previous_b_t, [0, 0, 0])
-            await turn_off_all()
+            await turn_off_all(lane=Lane.interactive)
             storage.put(SKeys.last_off, time.time())
             return
 
@@ -188,7 +189,7 @@ async def button_scenario():
                     skip = clicks
                     clicks = modes_order[0]
 
-        await turn_on_act(clicks, skip, check=False, feature_checkable=True, shadow=True)
+        await turn_on_act(clicks, skip, check=False, feature_checkable=True, shadow=True, lane=Lane.interactive)
         storage.put(SKeys.button_checked, False)
         storage.put(SKeys.random_colors_passive, False)
         storage.put(SKeys.clicks, clicks)
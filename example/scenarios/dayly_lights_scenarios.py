@@ -13,6 +13,7 @@ from smarthouse.storage import Storage
 from smarthouse.utils import MIN, get_time, get_timedelta_now
 from smarthouse.yandex_client.client import YandexClient
 from smarthouse.yandex_client.device import check_and_run_async, run_async
+from smarthouse.yandex_client.queues import Lane
 
 logger = logging.getLogger("root")
 
@@ -108,7 +109,7 @@ async def adaptive_lights_scenario():
 
     storage.put(SKeys.previous_b_t, [needed_b, needed_t, time.time()])
 
-    await run_async([lamp.on_temp(needed_t, needed_b) for lamp in ds.adaptive_lamps])
+    await run_async([lamp.on_temp(needed_t, needed_b) for lamp in ds.adaptive_lamps], lane=Lane.background)
 
 
 @looper(10)
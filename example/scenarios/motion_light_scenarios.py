@@ -11,6 +11,7 @@ from smarthouse.action_decorators import looper
 from smarthouse.storage import Storage
 from smarthouse.utils import HOUR, MIN, get_timedelta_now
 from smarthouse.yandex_client.device import run, run_async
+from smarthouse.yandex_client.queues import Lane
 
 
 @looper(0.5)
@@ -34,7 +35,10 @@ async def lights_corridor_on_scenario():
             max_b = 70 if datetime.timedelta(hours=8) < get_timedelta_now() < calc_sunset() else 40
             needed_b = min(needed_b * 100, max_b)
 
-            await run_async([lamp.on_temp(needed_t, needed_b) for lamp in [ds.lamp_e_1, ds.lamp_e_2, ds.lamp_e_3]])
+            await run_async(
+                [lamp.on_temp(needed_t, needed_b) for lamp in [ds.lamp_e_1, ds.lamp_e_2, ds.lamp_e_3]],
+                lane=Lane.interactive,
+            )
 
             return 3 * MIN
 
@@ -75,7 +79,7 @@ async def lights_wc_on_scenario():
 
         await asyncio.sleep(1)
         if device and not await device.is_on():
-            await run_async([ds.wc_1.on(), ds.wc_2.on()])
+            await run_async([ds.wc_1.on(), ds.wc_2.on()], lane=Lane.interactive)
 
         return 3 * MIN
 
@@ -106,6 +110,7 @@ async def lights_balcony_on_scenario():
             await ds.balcony_lamp.on().run_async(
                 lock_level=1,
                 lock=datetime.timedelta(minutes=5) - datetime.timedelta(seconds=balcony_sensor_motion_time),
+                lane=Lane.interactive,
             )
             storage.put(SKeys.balcony_lights, time.time())
             return 5 * MIN
@@ -123,7 +128,7 @@ async def lights_night_on_scenario():
     voice_min = storage._events.get("voice_min", 0)
 
     if max(voice_max, voice_min) < MIN and storage.get(SKeys.night) and not storage.get(SKeys.lights_locked):
-        await ds.lamp_k_1.on_temp(temperature_k=100, brightness=5).run_async()
+        await ds.lamp_k_1.on_temp(temperature_k=100, brightness=5).run_async(lane=Lane.interactive)
 
         return 10 * MIN
 
@@ -12,6 +12,7 @@ from smarthouse.storage import Storage
 from smarthouse.utils import MIN, get_timedelta_now
 from smarthouse.yandex_client.client import YandexClient
 from smarthouse.yandex_client.device import run_async
+from smarthouse.yandex_client.queues import Lane
 
 logger = logging.getLogger("root")
 
@@ -40,11 +41,11 @@ async def worker_for_web_scenario():
 
     if task == "evening":
         storage.put(SKeys.evening, True)
-        await turn_on_act(storage.get(SKeys.clicks), storage.get(SKeys.clicks))
+        await turn_on_act(storage.get(SKeys.clicks), storage.get(SKeys.clicks), lane=Lane.interactive)
 
     if task == "paint":
         storage.put(SKeys.paint, not storage.get(SKeys.paint, False))
-        await run_async(get_mode_with_off(ds.paint))
+        await run_async(get_mode_with_off(ds.paint), lane=Lane.interactive)
 
     if task == "air_cleaner_off":
         await ds.air_cleaner.off().run_async(lock_level=10, lock=datetime.timedelta(hours=30) - get_timedelta_now())
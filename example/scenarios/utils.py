@@ -11,6 +11,7 @@ from smarthouse.storage import Storage
 from smarthouse.utils import MIN, get_time, get_timedelta_now
 from smarthouse.yandex_client.client import YandexClient
 from smarthouse.yandex_client.device import LuxSensor, check_and_run_async, run_async
+from smarthouse.yandex_client.queues import Lane
 
 
 def get_modes_order():
@@ -58,9 +59,16 @@ def get_mode_with_off(current_mode: list):
     return current_mode + current_mode_off
 
 
-async def turn_on_act(clicks, prev, check: bool = True, feature_checkable: bool = False, shadow: bool = False):
+async def turn_on_act(
+    clicks,
+    prev,
+    check: bool = True,
+    feature_checkable: bool = False,
+    shadow: bool = False,
+    lane: Lane = Lane.normal,
+):
     current_mode = get_act(clicks)
-    await run_async(get_mode_with_off(current_mode), check=check, feature_checkable=feature_checkable)
+    await run_async(get_mode_with_off(current_mode), check=check, feature_checkable=feature_checkable, lane=lane)
     reg_on_prev(prev, shadow=shadow)
 
 
@@ -219,12 +227,12 @@ def get_zone():
         return zones[minute15 // 4]
 
 
-async def turn_off_all(shadow: bool = False):
+async def turn_off_all(shadow: bool = False, lane: Lane = Lane.normal):
     storage = Storage()
     ds = DeviceSet()
     storage.put(SKeys.random_colors_passive, False)
     storage.put(SKeys.random_colors, False)
-    await run_async([lamp.off() for lamp in ds.all_lamps], lock_level=11, lock=datetime.timedelta(seconds=0))
+    await run_async([lamp.off() for lamp in ds.all_lamps], lock_level=11, lock=datetime.timedelta(seconds=0), lane=lane)
     reg_on_prev(storage.get(SKeys.clicks), on=False, shadow=shadow)
 
 
@@ -234,11 +242,12 @@ async def sleep():
     storage = Storage()
     ds = DeviceSet()
 
-    storage.put(SKeys.sleep, True)
-    storage.put(SKeys.night, True)
-    storage.put(SKeys.max_brightness, 0.1)
-    storage.put(SKeys.random_colors, False)
-    storage.put(SKeys.random_colors_passive, False)
+    with storage.transaction() as transaction:
+        transaction.put(SKeys.sleep, True)
+        transaction.put(SKeys.night, True)
+        transaction.put(SKeys.max_brightness, 0.1)
+        transaction.put(SKeys.random_colors, False)
+        transaction.put(SKeys.random_colors_passive, False)
     ya_client.locks_reset()
     await ds.curtain.close().run_async(check=False, feature_checkable=True)
     await turn_off_all()
@@ -258,9 +267,10 @@ async def good_mo():
     storage = Storage()
     ds = DeviceSet()
 
-    storage.put(SKeys.sleep, False)
-    storage.put(SKeys.max_brightness, 1)
-    storage.put(SKeys.night, False)
+    with storage.transaction() as transaction:
+        transaction.put(SKeys.sleep, False)
+        transaction.put(SKeys.max_brightness, 1)
+        transaction.put(SKeys.night, False)
     ya_client.locks_reset()
     await ds.curtain.open().run_async(check=False, feature_checkable=True)
     await ds.lamp_k_1.off().run_async()
@@ -32,6 +32,9 @@ extras = {
     "ha": [
         "homeassistant_api>=4",
     ],
+    "msgpack": [
+        "msgpack",
+    ],
     "cloud": [
         "pyjwt",
         "cryptography",
@@ -68,7 +71,6 @@ setup(
         "telegram",
         "pydantic",
         "pydantic-settings",
-        "async_lru",
         "astral",
     ],
     extras_require=extras,
@@ -17,11 +17,15 @@ from smarthouse.scenarios.light_scenarios import (
     notifications_storage,
     notifications_ya_client,
     ping_devices,
+    poll_snapshot,
+    reconcile_states,
     stats,
     tg_actions,
     update_iam_token,
+    watch_devices,
     worker_check_and_run,
     worker_run,
+    worker_run_batch,
     write_storage,
 )
 from smarthouse.scenarios.system_scenarios import clear_quarantine, detect_human
@@ -30,6 +34,7 @@ from smarthouse.storage_keys import SysSKeys
 from smarthouse.telegram_client import TGClient
 from smarthouse.yandex_client.client import YandexClient
 from smarthouse.yandex_client.device import RunQueuesSet
+from smarthouse.yandex_client.push import push_routes
 
 logger = logging.getLogger("root")
 
@@ -70,6 +75,19 @@ class App:
         s3_mode: bool = False,
         iam_mode: bool = False,
         aiohttp_routes: Iterable[AbstractRouteDef] | None = None,
+        snapshot_mode: bool = False,
+        write_through: bool = False,
+        batch_window: float | None = None,
+        batch_workers: int = 10,
+        keep_alive: bool = False,
+        get_rate: float = 100,
+        post_rate: float = 50,
+        adaptive_polling: bool = False,
+        ping_concurrency: int = 10,
+        storage_backend: str = "file",
+        storage_format: str | None = None,
+        push_path: str | None = None,
+        push_token: str | None = None,
     ):
         signal.signal(signal.SIGINT, self.exit_gracefully)
         signal.signal(signal.SIGTERM, self.exit_gracefully)
@@ -90,6 +108,19 @@ class App:
         self.prod = prod
         self.s3_mode = s3_mode
         self.iam_mode = iam_mode
+        self.snapshot_mode = snapshot_mode
+        self.write_through = write_through
+        self.batch_window = batch_window
+        self.keep_alive = keep_alive
+        self.get_rate = get_rate
+        self.post_rate = post_rate
+        self.adaptive_polling = adaptive_polling
+        self.ping_concurrency = ping_concurrency
+        self.storage_backend = storage_backend
+        self.storage_format = storage_format
+        self.push_path = push_path
+        if push_path is not None and not push_token:
+            raise ValueError("push_path requires push_token")
 
         self.tasks = (
             [
@@ -104,16 +135,24 @@ class App:
                 # refresh_storage(self.s3_mode),
                 clear_quarantine(),
                 detect_human(),
+                watch_devices(),
             ]
-            + [worker_run()] * 100
+            + ([worker_run()] * 100 if batch_window is None else [worker_run_batch() for _ in range(batch_workers)])
             + [worker_check_and_run()] * 30
         )
         if self.iam_mode:
             self.tasks.append(update_iam_token())
+        if self.snapshot_mode:
+            self.tasks.append(poll_snapshot())
+        if self.write_through:
+            self.tasks.append(reconcile_states())
 
-        if aiohttp_routes is not None:
+        if aiohttp_routes is not None or push_path is not None:
             app = web.Application()
-            app.add_routes(aiohttp_routes)
+            if aiohttp_routes is not None:
+                app.add_routes(aiohttp_routes)
+            if push_path is not None and push_token:
+                app.add_routes(push_routes(push_token, push_path))
             self.tasks.append(web._run_app(app))
 
     async def async_exit_gracefully(self):
@@ -142,6 +181,7 @@ class App:
             ya_client.messages_queue.task_done()
 
         await ya_client.client.close()
+        await ya_client.china_client.close()
 
         if need_to_sleep:
             logger.info("going to sleep for an hour")
@@ -173,9 +213,25 @@ class App:
                 aws_access_key_id=self.aws_access_key_id,
                 aws_secret_access_key=self.aws_secret_access_key,
             )
-        await Storage().init(storage_name=self.storage_name, s3_mode=self.s3_mode)
+        await Storage().init(
+            storage_name=self.storage_name,
+            s3_mode=self.s3_mode,
+            backend=self.storage_backend,
+            storage_format=self.storage_format,
+        )
 
-        YandexClient().init(yandex_token=self.yandex_token, prod=self.prod)
+        YandexClient().init(
+            yandex_token=self.yandex_token,
+            prod=self.prod,
+            snapshot_mode=self.snapshot_mode,
+            write_through=self.write_through,
+            keep_alive=self.keep_alive,
+            get_rate=self.get_rate,
+            post_rate=self.post_rate,
+            adaptive_polling=self.adaptive_polling,
+            ping_concurrency=self.ping_concurrency,
+        )
+        await YandexClient().warm_up()
 
         # await HAClient().init(base_url=self.ha_url, ha_token=self.ha_token, prod=self.prod)
 
@@ -185,7 +241,7 @@ class App:
         for pattern, func in self.tg_handlers:
             tg_client.register_handler(pattern, func)
 
-        RunQueuesSet().init()
+        RunQueuesSet().init(batch_window=self.batch_window)
 
         storage = Storage()
         if storage.get(SysSKeys.clear_log):
@@ -8,9 +8,13 @@ from typing import Any, Generic, Optional, TypeVar
 
 from pydantic import BaseModel
 
-from smarthouse.base_client.exceptions import DeviceOffline, InfraCheckError, InfraServerError
+from smarthouse.base_client.exceptions import DeviceOffline, InfraCheckError, InfraServerError, ProgrammingError
 from smarthouse.base_client.gap_stat import GapStat
 from smarthouse.base_client.models import LockItem, QuarantineItem
+from smarthouse.base_client.pinger import Pinger
+from smarthouse.base_client.probe_scheduler import ProbeScheduler
+from smarthouse.base_client.state_cache import StateCache
+from smarthouse.base_client.topology import Topology
 from smarthouse.base_client.utils import retry
 from smarthouse.utils import Singleton
 from smarthouse.yandex_client.models import DeviceCapabilityAction, StateItem
@@ -32,6 +36,17 @@ class BaseClient(Generic[DeviceInfoResponseType, ActionRequestModelType], metacl
     _outdated: dict[str, bool]
     _calls_get: dict[str, float]
     _calls_post: dict[str, float]
+    _inflight: dict[tuple[str, bool], asyncio.Task]
+    _waiters: dict[asyncio.Task, int]
+    _coalesced: dict[str, int]
+    _cache: StateCache[DeviceInfoResponseType]
+    _reconcile_queue: asyncio.Queue
+    _changed: set[str]
+    _suspects: dict[str, tuple[float, StateItem]]
+    pinger: Pinger
+    probe_scheduler: ProbeScheduler
+    topology: Topology
+    write_through: bool = False
 
     messages_queue: asyncio.Queue
     names: dict[str, str]
@@ -50,6 +65,16 @@ class BaseClient(Generic[DeviceInfoResponseType, ActionRequestModelType], metacl
         self._calls_post: dict[str, float] = {}
         self._states: dict[str, StateItem] = {}
         self._last: dict[str, tuple[DeviceInfoResponseType, float]] = {}
+        self._inflight: dict[tuple[str, bool], asyncio.Task] = {}
+        self._waiters: dict[asyncio.Task, int] = {}
+        self._coalesced: dict[str, int] = {}
+        self._cache: StateCache[DeviceInfoResponseType] = StateCache()
+        self._reconcile_queue: asyncio.Queue = asyncio.Queue()
+        self._changed: set[str] = set()
+        self._suspects: dict[str, tuple[float, StateItem]] = {}
+        self.pinger = Pinger()
+        self.probe_scheduler = ProbeScheduler()
+        self.topology = Topology()
 
         self.messages_queue: asyncio.Queue = asyncio.Queue()
         self.names: dict[str, str] = {}
@@ -65,8 +90,11 @@ class BaseClient(Generic[DeviceInfoResponseType, ActionRequestModelType], metacl
         human_time_func=lambda timestamp=None: (timestamp or time.time()) + 15 * 60,
         outdated: bool = False,
         use_china_client=False,
+        hub: str | None = None,
     ):
         self.names[device_id] = name
+        if hub is not None:
+            self.topology.add(device_id, hub)
         if ping:
             self._ping.add(device_id)
         self._human_time_funcs[device_id] = self._human_time_funcs.get(device_id) or human_time_func
@@ -79,6 +107,7 @@ class BaseClient(Generic[DeviceInfoResponseType, ActionRequestModelType], metacl
         self._mutations[device_id] = mutation
 
     def _quarantine_set(self, device_id: str, data: Optional[dict] = None) -> None:
+        self._cache.invalidate(device_id)
         if data is not None or device_id not in self._quarantine:
             self._quarantine[device_id] = QuarantineItem(data=data)
         if device_id not in self._gss:
@@ -122,6 +151,7 @@ class BaseClient(Generic[DeviceInfoResponseType, ActionRequestModelType], metacl
 
     def states_set(self, device_id: str, state: StateItem) -> None:
         self._states[device_id] = state
+        self._changed.add(device_id)
 
     def states_get(self, device_id: str) -> StateItem:
         return self._states[device_id]
@@ -132,6 +162,10 @@ class BaseClient(Generic[DeviceInfoResponseType, ActionRequestModelType], metacl
     def states_in(self, device_id: str) -> bool:
         return device_id in self._states
 
+    def take_changed(self) -> set[str]:
+        changed, self._changed = self._changed, set()
+        return changed
+
     def last_get(self, device_id: str) -> tuple[DeviceInfoResponseType, float]:
         return self._last[device_id]
 
@@ -174,16 +208,68 @@ class BaseClient(Generic[DeviceInfoResponseType, ActionRequestModelType], metacl
     ) -> DeviceInfoResponseType:
         raise Exception()
 
+    def _cache_max_age(self, device_id: str, hash_seconds: float | None = 1) -> float | None:
+        return hash_seconds
+
+    def is_fresh(self, device_id: str, hash_seconds: float | None = 1) -> bool:
+        if (max_age := self._cache_max_age(device_id, hash_seconds)) is None or (
+            age := self._cache.age(device_id)
+        ) is None:
+            return False
+        return age <= max_age
+
+    def _on_device_info(self, device_id: str, result: DeviceInfoResponseType) -> None:
+        pass
+
     async def device_info(
-        self, device_id: str, ignore_quarantine=False, process_last=False, hash_seconds: float | None = 1
+        self,
+        device_id: str,
+        ignore_quarantine=False,
+        process_last=False,
+        hash_seconds: float | None = 1,
+        optimistic: bool = True,
     ) -> DeviceInfoResponseType | None:
         if process_last:
             return self.last_get(device_id)[0] if self.last_in(device_id) else None
+        if not ignore_quarantine and self.quarantine_in(device_id):
+            return None
+        max_age = self._cache_max_age(device_id, hash_seconds)
+        if (cached := self._cache.get(device_id, max_age, optimistic=optimistic)) is not None:
+            return cached
+
+        key = (device_id, ignore_quarantine)
+        if (task := self._inflight.get(key)) is not None:
+            self._coalesced[device_id] = self._coalesced.get(device_id, 0) + 1
+        else:
+            task = asyncio.create_task(self._fetch_device_info(device_id, ignore_quarantine, hash_seconds))
+            task.add_done_callback(lambda _: self._inflight_done(key, task))
+            self._inflight[key] = task
+
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[task] == 1 and not task.done():
+                task.cancel()
+                self._inflight_done(key, task)
+            raise
+        finally:
+            if waiters := self._waiters.pop(task) - 1:
+                self._waiters[task] = waiters
+
+    def _inflight_done(self, key: tuple[str, bool], task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            self._inflight.pop(key)
+
+    async def _fetch_device_info(
+        self, device_id: str, ignore_quarantine=False, hash_seconds: float | None = 1
+    ) -> DeviceInfoResponseType | None:
+        generation = self._cache.generation(device_id)
         try:
-            if not ignore_quarantine and self.quarantine_in(device_id):
-                return None
             result = await self._device_info(device_id, ignore_quarantine, not ignore_quarantine, hash_seconds)
             self.last_set(device_id, result)
+            self._cache.set(device_id, result, generation=generation)
+            self._on_device_info(device_id, result)
             return result
         except (DeviceOffline, InfraServerError) as exc:
             self._quarantine_set(device_id)
@@ -197,6 +283,9 @@ class BaseClient(Generic[DeviceInfoResponseType, ActionRequestModelType], metacl
     def device_from_action(self, action: DeviceCapabilityAction) -> BaseModel:
         raise Exception()
 
+    def optimistic_device_info(self, action: DeviceCapabilityAction) -> DeviceInfoResponseType | None:
+        return None
+
     async def devices_action(
         self,
         actions_list: list[DeviceCapabilityAction],
@@ -205,6 +294,17 @@ class BaseClient(Generic[DeviceInfoResponseType, ActionRequestModelType], metacl
         checkable=False,
         excl: dict[str, tuple[tuple[str, str], ...]] | None = None,
     ) -> Any:
+        filtered_actions = await self._prepare_devices_action(actions_list, lock_level, lock, checkable, excl)
+        return await self._send_devices_action(filtered_actions, actions_list)
+
+    async def _prepare_devices_action(
+        self,
+        actions_list: list[DeviceCapabilityAction],
+        lock_level=0,
+        lock: datetime.timedelta | None = None,
+        checkable=False,
+        excl: dict[str, tuple[tuple[str, str], ...]] | None = None,
+    ) -> list[DeviceCapabilityAction]:
         if excl is None:
             excl = {}
 
@@ -226,8 +326,13 @@ class BaseClient(Generic[DeviceInfoResponseType, ActionRequestModelType], metacl
             else:
                 self.states_remove(action.device_id)
 
+        return filtered_actions
+
+    async def _send_devices_action(
+        self, filtered_actions: list[DeviceCapabilityAction], actions_list: list[DeviceCapabilityAction]
+    ) -> Any:
         try:
-            return await self._devices_action(filtered_actions)
+            response = await self._devices_action(filtered_actions)
         except (DeviceOffline, InfraServerError) as exc:
             logger.exception(exc)
             actions_dict = {action.device_id: action for action in actions_list}
@@ -237,6 +342,15 @@ class BaseClient(Generic[DeviceInfoResponseType, ActionRequestModelType], metacl
             if exc.send:
                 await self.messages_queue.put({"message": str(exc)})
             return None
+        finally:
+            for action in filtered_actions:
+                self._cache.invalidate(action.device_id)
+
+        if self.write_through:
+            for action in filtered_actions:
+                if (device_info := self.optimistic_device_info(action)) is not None:
+                    self._cache.set(action.device_id, device_info, optimistic=True)
+        return response
 
     async def _check_devices_capabilities(
         self,
@@ -256,10 +370,34 @@ class BaseClient(Generic[DeviceInfoResponseType, ActionRequestModelType], metacl
         lock_level=0,
         lock: datetime.timedelta | None = None,
         feature_checkable=False,
+        write_through: bool | None = None,
     ):
-        await self.devices_action(actions_list, lock_level, lock, check or feature_checkable, excl)
+        response = await self.devices_action(actions_list, lock_level, lock, check or feature_checkable, excl)
 
         if check:
+            await self._verify_devices_action(
+                actions_list, response, excl, lock_level, feature_checkable, write_through
+            )
+
+    async def _verify_devices_action(
+        self,
+        actions_list: list[DeviceCapabilityAction],
+        response: Any,
+        excl: dict[str, tuple[tuple[str, str], ...]] | None = None,
+        lock_level=0,
+        feature_checkable=False,
+        write_through: bool | None = None,
+    ):
+        if response is not None and (self.write_through if write_through is None else write_through):
+            await self._reconcile_queue.put(
+                {
+                    "actions_list": actions_list,
+                    "excl": excl,
+                    "lock_level": lock_level,
+                    "feature_checkable": feature_checkable,
+                }
+            )
+        else:
             await self._check_devices_capabilities(actions_list, excl, err_retry=True)
 
     async def change_devices_capabilities(
@@ -270,10 +408,11 @@ class BaseClient(Generic[DeviceInfoResponseType, ActionRequestModelType], metacl
         lock_level=0,
         lock: datetime.timedelta | None = None,
         feature_checkable=False,
+        write_through: bool | None = None,
     ):
         try:
             return await self._change_devices_capabilities(
-                actions_list, check, excl, lock_level, lock, feature_checkable
+                actions_list, check, excl, lock_level, lock, feature_checkable, write_through
             )
         except InfraCheckError as exc:
             for device_id in exc.device_ids:
@@ -287,3 +426,55 @@ class BaseClient(Generic[DeviceInfoResponseType, ActionRequestModelType], metacl
                     ),
                 )
             await self.messages_queue.put({"message": f"Device state check error:\n{exc}"})
+
+    async def reconcile(
+        self,
+        actions_list: list[DeviceCapabilityAction],
+        excl: dict[str, tuple[tuple[str, str], ...]] | None = None,
+        lock_level=0,
+        feature_checkable=False,
+    ):
+        try:
+            await self._check_devices_capabilities(actions_list, excl, err_retry=False)
+        except InfraCheckError:
+            await self.change_devices_capabilities(
+                actions_list, True, excl, lock_level, feature_checkable=feature_checkable, write_through=False
+            )
+
+    async def change_devices_capabilities_batch(self, batch: list[dict]):
+        actions_list: list[DeviceCapabilityAction] = []
+        filtered_actions: list[DeviceCapabilityAction] = []
+        for item in batch:
+            actions_list.extend(item["actions_list"])
+            filtered_actions.extend(
+                await self._prepare_devices_action(
+                    item["actions_list"],
+                    item["lock_level"],
+                    item["lock"],
+                    item["check"] or item["feature_checkable"],
+                    item["excl"],
+                )
+            )
+
+        try:
+            response = await self._send_devices_action(filtered_actions, actions_list)
+        except ProgrammingError:
+            for item in batch:
+                await self._change_devices_capabilities_item(item)
+            return
+
+        for item in batch:
+            if not item["check"]:
+                continue
+            try:
+                await self._verify_devices_action(
+                    item["actions_list"], response, item["excl"], item["lock_level"], item["feature_checkable"]
+                )
+            except InfraCheckError:
+                await self._change_devices_capabilities_item(item)
+
+    async def _change_devices_capabilities_item(self, item: dict):
+        try:
+            await self.change_devices_capabilities(**item)
+        except Exception as exc:
+            logger.exception(exc)
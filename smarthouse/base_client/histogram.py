@@ -0,0 +1,34 @@
+from collections import deque
+
+
+class Histogram:
+    def __init__(self, size: int = 1000) -> None:
+        self._dq: deque[float] = deque(maxlen=size)
+        self.count = 0
+        self.sum = 0.0
+
+    def add(self, value: float) -> None:
+        self._dq.append(value)
+        self.count += 1
+        self.sum += value
+
+    def percentile(self, q: float) -> float:
+        if not self._dq:
+            return 0.0
+        values = sorted(self._dq)
+        return values[min(len(values) - 1, int(len(values) * q / 100))]
+
+    def summary(self) -> dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": round(self.sum / self.count, 4) if self.count else 0.0,
+            "p50": round(self.percentile(50), 4),
+            "p95": round(self.percentile(95), 4),
+            "p99": round(self.percentile(99), 4),
+            "max": round(max(self._dq), 4) if self._dq else 0.0,
+        }
+
+    def reset(self) -> None:
+        self._dq.clear()
+        self.count = 0
+        self.sum = 0.0
@@ -0,0 +1,67 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Iterable
+
+from smarthouse.base_client.histogram import Histogram
+from smarthouse.utils import MIN
+
+
+class Pinger:
+    def __init__(self, period: float = MIN, concurrency: int = 10, spread: float = 0.5) -> None:
+        self.period = period
+        self.concurrency = max(1, concurrency)
+        self.spread = spread
+
+        self.durations = Histogram()
+        self.last_duration = 0.0
+        self.probed = 0
+        self.skipped = 0
+
+    async def sweep(
+        self,
+        device_ids: Iterable[str],
+        probe: Callable[[str], Awaitable[object]],
+        fresh: Callable[[str], bool],
+    ) -> float:
+        start = time.monotonic()
+        due = []
+        for device_id in list(device_ids):
+            if fresh(device_id):
+                self.skipped += 1
+            else:
+                due.append(device_id)
+
+        step = self.period * self.spread / len(due) if due else 0.0
+        items = enumerate(due)
+        errors: list[Exception] = []
+
+        async def worker() -> None:
+            for index, device_id in items:
+                if (delay := start + index * step - time.monotonic()) > 0:
+                    await asyncio.sleep(delay)
+                try:
+                    await probe(device_id)
+                except Exception as exc:
+                    errors.append(exc)
+                self.probed += 1
+
+        await asyncio.gather(*[worker() for _ in range(min(self.concurrency, len(due)))])
+
+        self.last_duration = time.monotonic() - start
+        self.durations.add(self.last_duration)
+        if errors:
+            raise errors[0]
+        return self.last_duration
+
+    def stats(self) -> dict:
+        return {
+            "last_duration": round(self.last_duration, 3),
+            "duration": self.durations.summary(),
+            "probed": self.probed,
+            "skipped": self.skipped,
+        }
+
+    def reset_stats(self) -> None:
+        self.durations.reset()
+        self.probed = 0
+        self.skipped = 0
@@ -0,0 +1,93 @@
+import heapq
+import random
+import time
+from typing import Iterable
+
+from smarthouse.utils import HOUR
+
+
+class ProbeScheduler:
+    def __init__(
+        self,
+        base: float = 10,
+        max_delay: float = HOUR,
+        factor: float = 2,
+        jitter: float = 0.2,
+        concurrency: int = 5,
+        seed: int | None = None,
+    ) -> None:
+        self.base = base
+        self.max_delay = max_delay
+        self.factor = factor
+        self.jitter = jitter
+        self.concurrency = max(1, concurrency)
+        self.random = random.Random(seed)
+
+        self._heap: list[tuple[float, str]] = []
+        self._next: dict[str, float] = {}
+        self._failures: dict[str, int] = {}
+
+        self.probes = 0
+        self.recoveries = 0
+
+    def delay(self, failures: int) -> float:
+        delay = min(self.max_delay, self.base * self.factor**failures)
+        return delay * self.random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _schedule(self, device_id: str, timestamp: float) -> None:
+        self._next[device_id] = timestamp
+        heapq.heappush(self._heap, (timestamp, device_id))
+
+    def add(self, device_id: str, now: float | None = None) -> None:
+        if device_id not in self._next:
+            failures = self._failures.setdefault(device_id, 0)
+            self._schedule(device_id, (now if now is not None else time.time()) + self.delay(failures))
+
+    def discard(self, device_id: str) -> None:
+        self._next.pop(device_id, None)
+        self._failures.pop(device_id, None)
+
+    def sync(self, device_ids: Iterable[str], now: float | None = None) -> None:
+        device_ids = set(device_ids)
+        for device_id in set(self._failures) - device_ids:
+            self.discard(device_id)
+        for device_id in device_ids:
+            self.add(device_id, now)
+
+    def due(self, now: float | None = None) -> list[str]:
+        now = now if now is not None else time.time()
+        result = []
+        while self._heap and self._heap[0][0] <= now:
+            timestamp, device_id = heapq.heappop(self._heap)
+            if self._next.get(device_id) == timestamp:
+                self._next.pop(device_id)
+                result.append(device_id)
+        self.probes += len(result)
+        return result
+
+    def failed(self, device_id: str, now: float | None = None) -> None:
+        failures = self._failures.get(device_id, 0) + 1
+        self._failures[device_id] = failures
+        self._schedule(device_id, (now if now is not None else time.time()) + self.delay(failures))
+
+    def recovered(self, device_id: str) -> None:
+        self.discard(device_id)
+        self.recoveries += 1
+
+    def next_time(self) -> float | None:
+        while self._heap and self._next.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def failures(self, device_id: str) -> int:
+        return self._failures.get(device_id, 0)
+
+    def __len__(self) -> int:
+        return len(self._failures)
+
+    def stats(self) -> dict:
+        return {"quarantined": len(self), "probes": self.probes, "recoveries": self.recoveries}
+
+    def reset_stats(self) -> None:
+        self.probes = 0
+        self.recoveries = 0
@@ -0,0 +1,74 @@
+import asyncio
+import time
+
+from smarthouse.base_client.histogram import Histogram
+
+
+class AdaptiveRateLimiter:
+    def __init__(
+        self,
+        rate: float,
+        min_rate: float = 1,
+        burst: float | None = None,
+        increase: float = 1,
+        decrease: float = 0.5,
+        cooldown: float = 1,
+    ) -> None:
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._decreased = float("-inf")
+
+        self.waits = Histogram()
+        self.throttled = 0
+        self.failures = 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> float:
+        self._refill()
+        self._tokens -= 1
+        if self._tokens >= 0:
+            self.waits.add(0)
+            return 0
+        wait = -self._tokens / self.rate
+        self.throttled += 1
+        self.waits.add(wait)
+        await asyncio.sleep(wait)
+        return wait
+
+    def on_success(self) -> None:
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+    def on_failure(self) -> None:
+        self.failures += 1
+        now = time.monotonic()
+        if now - self._decreased < self.cooldown:
+            return None
+        self._decreased = now
+        self._refill()
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+
+    def stats(self) -> dict:
+        return {
+            "rate": round(self.rate, 2),
+            "throttled": self.throttled,
+            "failures": self.failures,
+            "wait": self.waits.summary(),
+        }
+
+    def reset_stats(self) -> None:
+        self.waits.reset()
+        self.throttled = 0
+        self.failures = 0
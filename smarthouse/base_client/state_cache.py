@@ -0,0 +1,105 @@
+import time
+from collections import OrderedDict
+from typing import Generic, NamedTuple, TypeVar
+
+from smarthouse.base_client.histogram import Histogram
+
+ValueType = TypeVar("ValueType")
+
+
+class CacheItem(NamedTuple, Generic[ValueType]):
+    value: ValueType
+    timestamp: float
+    optimistic: bool = False
+
+
+class StateCache(Generic[ValueType]):
+    def __init__(self, maxsize: int = 1024) -> None:
+        self._maxsize = maxsize
+        self._items: OrderedDict[str, CacheItem[ValueType]] = OrderedDict()
+        self._clock = 0
+        self._invalidated: OrderedDict[str, int] = OrderedDict()
+        self._floor = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.optimistic_hits = 0
+        self.ages = Histogram()
+
+    def get(self, key: str, max_age: float | None, optimistic: bool = True) -> ValueType | None:
+        if max_age is None or (item := self._items.get(key)) is None or item.optimistic and not optimistic:
+            self.misses += 1
+            return None
+        age = time.time() - item.timestamp
+        if age > max_age:
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        if item.optimistic:
+            self.optimistic_hits += 1
+        self.ages.add(age)
+        return item.value
+
+    def generation(self, key: str | None = None) -> int:
+        return self._clock
+
+    def set(
+        self,
+        key: str,
+        value: ValueType,
+        timestamp: float | None = None,
+        generation: int | None = None,
+        optimistic: bool = False,
+    ) -> bool:
+        if generation is not None and generation < self._invalidated.get(key, self._floor):
+            return False
+        self._items[key] = CacheItem(value, timestamp if timestamp is not None else time.time(), optimistic)
+        self._items.move_to_end(key)
+        while len(self._items) > self._maxsize:
+            self._items.popitem(last=False)
+            self.evictions += 1
+        return True
+
+    def peek(self, key: str) -> CacheItem[ValueType] | None:
+        return self._items.get(key)
+
+    def age(self, key: str) -> float | None:
+        if (item := self._items.get(key)) is None:
+            return None
+        return time.time() - item.timestamp
+
+    def invalidate(self, key: str) -> None:
+        self._items.pop(key, None)
+        self._clock += 1
+        self._invalidated[key] = self._clock
+        self._invalidated.move_to_end(key)
+        while len(self._invalidated) > self._maxsize:
+            self._floor = self._invalidated.popitem(last=False)[1]
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._items),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "optimistic_hits": self.optimistic_hits,
+            "age": self.ages.summary(),
+        }
+
+    def reset_stats(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.optimistic_hits = 0
+        self.ages.reset()
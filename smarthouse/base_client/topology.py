@@ -0,0 +1,58 @@
+from collections import defaultdict
+
+
+class Topology:
+    def __init__(self, threshold: int = 3, ratio: float = 0.5, rotate_after: int = 2) -> None:
+        self.threshold = threshold
+        self.ratio = ratio
+        self.rotate_after = rotate_after
+
+        self._hubs: dict[str, str] = {}
+        self._members: dict[str, set[str]] = defaultdict(set)
+        self._down: dict[str, set[str]] = {}
+        self._rotation: dict[str, int] = {}
+
+        self.outages = 0
+
+    def add(self, device_id: str, hub: str) -> None:
+        if (previous := self._hubs.get(device_id)) is not None:
+            self._members[previous].discard(device_id)
+        self._hubs[device_id] = hub
+        self._members[hub].add(device_id)
+
+    def hub(self, device_id: str) -> str | None:
+        return self._hubs.get(device_id)
+
+    def members(self, hub: str) -> set[str]:
+        return set(self._members.get(hub, ()))
+
+    def update(self, quarantined: set[str]) -> dict[str, set[str]]:
+        down = {}
+        for hub, members in self._members.items():
+            failed = members & quarantined
+            if len(failed) >= self.threshold and len(failed) >= self.ratio * len(members):
+                down[hub] = failed
+        self.outages += len(set(down) - set(self._down))
+        self._down = down
+        self._rotation = {hub: index for hub, index in self._rotation.items() if hub in down}
+        return down
+
+    def down(self) -> dict[str, set[str]]:
+        return {hub: set(failed) for hub, failed in self._down.items()}
+
+    @staticmethod
+    def representative(failed: set[str]) -> str:
+        return min(failed)
+
+    def alternate(self, hub: str, failed: set[str]) -> str | None:
+        if not (candidates := sorted(failed - {self.representative(failed)})):
+            return None
+        index = self._rotation.get(hub, 0) % len(candidates)
+        self._rotation[hub] = index + 1
+        return candidates[index]
+
+    def stats(self) -> dict:
+        return {"hubs": len(self._members), "down": len(self._down), "outages": self.outages}
+
+    def reset_stats(self) -> None:
+        self.outages = 0
@@ -8,7 +8,7 @@ from smarthouse.storage_keys import SysSKeys
 from smarthouse.telegram_client import TGClient
 from smarthouse.utils import HOUR, MIN
 from smarthouse.yandex_client.client import YandexClient
-from smarthouse.yandex_client.device import RunQueuesSet, check_and_run, run
+from smarthouse.yandex_client.device import RunQueuesSet, check_and_run, run, run_batch
 from smarthouse.yandex_client.models import DeviceCapabilityAction, StateItem
 from smarthouse.yandex_client.utils import get_current_capabilities
 
@@ -28,6 +28,29 @@ async def worker_run():
             pass
 
 
+async def worker_run_batch():
+    while True:
+        try:
+            run_queues_set = RunQueuesSet()
+            run_queue = run_queues_set.run
+
+            tasks = [await run_queue.get()]
+            try:
+                await asyncio.sleep(run_queues_set.batch_window or 0)
+                while len(tasks) < run_queues_set.batch_max_size:
+                    try:
+                        tasks.append(run_queue.get_nowait())
+                    except asyncio.QueueEmpty:
+                        break
+
+                await run_batch(tasks)
+            finally:
+                for _ in tasks:
+                    run_queue.task_done()
+        except Exception as exc:
+            logger.exception(exc)
+
+
 async def worker_check_and_run():
     while True:
         try:
@@ -61,6 +84,15 @@ async def notifications_storage():
     storage.messages_queue.task_done()
 
 
+@looper(0)
+async def reconcile_states():
+    ya_client = YandexClient()
+
+    task = await ya_client._reconcile_queue.get()
+    await ya_client.reconcile(**task)
+    ya_client._reconcile_queue.task_done()
+
+
 @looper(0.5)
 async def tg_actions():
     tg_client = TGClient()
@@ -109,10 +141,9 @@ async def update_iam_token():
 @looper(MIN)
 async def ping_devices():
     ya_client = YandexClient()
+    pinger = ya_client.pinger
 
-    for device_id in ya_client._ping:
-        device_info = await ya_client.device_info(device_id)
-
+    def seed(device_id, device_info):
         if not ya_client.quarantine_in(device_id) and not ya_client.states_in(device_id):
             ya_client.states_set(
                 device_id,
@@ -126,14 +157,42 @@ async def ping_devices():
                 ),
             )
 
-        await asyncio.sleep(1)
+    async def ping(device_id):
+        seed(device_id, await ya_client.device_info(device_id, hash_seconds=pinger.period))
+
+    def fresh(device_id):
+        if ya_client.quarantine_in(device_id):
+            return True
+        if (item := ya_client._cache.peek(device_id)) is None or item.optimistic:
+            return False
+        if not ya_client.is_fresh(device_id, pinger.period):
+            return False
+        seed(device_id, item.value)
+        return True
+
+    duration = await pinger.sweep(ya_client._ping, ping, fresh)
+    return max(pinger.period - duration, 1)
+
+
+@looper(1)
+async def poll_snapshot():
+    ya_client = YandexClient()
+    await ya_client.refresh_snapshot()
+
+
+@looper(0.5)
+async def watch_devices():
+    ya_client = YandexClient()
+    device_ids = [device_id for device_id in ya_client.events.watched() if device_id is not None]
+    await asyncio.gather(*[ya_client.device_info(device_id, hash_seconds=0.5) for device_id in device_ids])
 
 
 @looper(24 * HOUR)
 async def stats():
     ya_client = YandexClient()
     storage = Storage()
-    logger.debug(f"{YandexClient._request.cache_info()}")
+    logger.debug(f"cache: {ya_client._cache.stats()}")
+    ya_client._cache.reset_stats()
 
     for path, total_time in sorted(ya_client._stats.items(), key=lambda item: -item[1]):
         clean_path = path
@@ -153,6 +212,60 @@ async def stats():
             logger.debug(f"POST {ya_client.names.get(device_id)}: {calls_post} times")
     ya_client._calls_post = {}
 
+    for device_id, coalesced in sorted(ya_client._coalesced.items(), key=lambda item: -item[1]):
+        if coalesced > 5:
+            logger.debug(f"coalesced {ya_client.names.get(device_id)}: {coalesced} times")
+    ya_client._coalesced = {}
+
+    logger.debug(f"connections: {ya_client._connection_stats}")
+    ya_client._connection_stats = {"created": 0, "reused": 0}
+
+    logger.debug(f"events: {ya_client.events.stats()}")
+    logger.debug(f"push: {ya_client._push_stats}")
+    ya_client._push_stats = {"callbacks": 0, "devices": 0, "unknown": 0}
+    ya_client.events.published = 0
+    ya_client.events.dropped = 0
+
+    for method, limiter in ya_client._limiters.items():
+        logger.debug(f"rate limiter {method}: {limiter.stats()}")
+        limiter.reset_stats()
+
+    logger.debug(f"ping: {ya_client.pinger.stats()}")
+    ya_client.pinger.reset_stats()
+
+    logger.debug(f"quarantine probes: {ya_client.probe_scheduler.stats()}")
+    ya_client.probe_scheduler.reset_stats()
+
+    logger.debug(f"topology: {ya_client.topology.stats()}")
+    ya_client.topology.reset_stats()
+
+    if ya_client.adaptive_polling:
+        poll_scheduler = ya_client.poll_scheduler
+        logger.debug(f"adaptive polling saved {poll_scheduler.saved} calls")
+        for device_id, cadence in sorted(poll_scheduler._cadences.items(), key=lambda item: item[1]):
+            logger.debug(f"cadence {ya_client.names.get(device_id)}: {round(cadence, 1)}s")
+        poll_scheduler.saved = 0
+
+    if ya_client.snapshot_mode:
+        logger.debug(f"snapshot: {ya_client._snapshot_stats}")
+        ya_client._snapshot_stats = {"refreshes": 0, "devices": 0}
+
+    run_queues_set = RunQueuesSet()
+    logger.debug(f"run queue wait: {run_queues_set.run.waits_summary()}")
+    logger.debug(f"check_and_run queue wait: {run_queues_set.check_and_run.waits_summary()}")
+    logger.debug(f"superseded actions: {run_queues_set.run.superseded}")
+    run_queues_set.run.reset_waits()
+    run_queues_set.check_and_run.reset_waits()
+    run_queues_set.run.superseded = 0
+    if run_queues_set.batch_window is not None:
+        logger.debug(f"batch size: {run_queues_set.batch_sizes.summary()}, merged: {run_queues_set.merged}")
+        run_queues_set.batch_sizes.reset()
+        run_queues_set.merged = 0
+
+    if storage._backend is not None:
+        logger.debug(f"storage: {storage._backend.stats()}")
+        storage._backend.reset_stats()
+
     logger.debug(f"max_run_queue_size: {storage.get(SysSKeys.max_run_queue_size)}")
     logger.debug(f"max_check_and_run_queue_size: {storage.get(SysSKeys.max_check_and_run_queue_size)}")
     storage.put(SysSKeys.max_run_queue_size, 0)
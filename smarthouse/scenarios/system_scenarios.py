@@ -1,5 +1,4 @@
 import asyncio
-import copy
 import logging
 import time
 
@@ -20,81 +19,151 @@ logger = logging.getLogger("root")
 async def clear_quarantine():
     ya_client = YandexClient()
     storage = Storage()
+    scheduler = ya_client.probe_scheduler
+    topology = ya_client.topology
+    semaphore = asyncio.Semaphore(scheduler.concurrency)
     quarantine_notifications = storage.get(SysSKeys.quarantine_notifications, {})
-    quarantine_keys = ya_client.quarantine_ids()
-    for device_id in quarantine_keys:
-        if device_id in ya_client._ping and (info := ya_client.quarantine_get(device_id)) is not None:
-            if (device_info := await ya_client.device_info(device_id, True)) is not None:
-                quarantine_notifications[device_id] = 0
-                ya_client._quarantine_remove(device_id)
-                if info.data is not None and time.time() - info.timestamp < 10 * MIN:
-                    await ya_client.change_devices_capabilities(info.data["actions"])
-                elif ya_client.states_in(device_id):
-                    state = ya_client.states_get(device_id)
-                    try:
-                        await ya_client._check_devices_capabilities(
-                            state.actions_list, {device_id: state.excl}, err_retry=False, real_action=False
-                        )
-                    except DeviceOffline:
-                        ya_client._quarantine_set(device_id)
-                    except InfraCheckError as exc:
-                        await register_human(device_id, exc, state, info.timestamp)
-                else:
-                    ya_client.states_set(
-                        device_id,
-                        StateItem(
-                            actions_list=[
-                                DeviceCapabilityAction(
-                                    device_id=device_id, capabilities=get_current_capabilities(device_info)
-                                )
-                            ],
-                            excl=(),
-                            checked=True,
-                            mutated=True,
-                        ),
-                    )
-            elif time.time() - info.timestamp > 3600 * (2 ** quarantine_notifications.get(device_id, 0)):
-                await storage.messages_queue.put(
-                    {
-                        "message": f"{ya_client.names.get(device_id, device_id)}: "
-                        f"{int(time.time() - info.timestamp) // 3600}h",
-                        "to_delete": True,
-                        "to_delete_timestamp": time.time() + 10 * MIN,
-                    }
+
+    async def probe(device_id):
+        if (info := ya_client.quarantine_get(device_id)) is None:
+            scheduler.discard(device_id)
+            return False
+        async with semaphore:
+            device_info = await ya_client.device_info(device_id, True)
+        if device_info is None:
+            scheduler.failed(device_id)
+            return False
+
+        scheduler.recovered(device_id)
+        quarantine_notifications[device_id] = 0
+        ya_client._quarantine_remove(device_id)
+        if info.data is not None and time.time() - info.timestamp < 10 * MIN:
+            await ya_client.change_devices_capabilities(info.data["actions"])
+        elif ya_client.states_in(device_id):
+            state = ya_client.states_get(device_id)
+            try:
+                await ya_client._check_devices_capabilities(
+                    state.actions_list, {device_id: state.excl}, err_retry=False, real_action=False
                 )
-                quarantine_notifications[device_id] = quarantine_notifications.get(device_id, 0) + 1
+            except DeviceOffline:
+                ya_client._quarantine_set(device_id)
+            except InfraCheckError as exc:
+                await register_human(device_id, exc, state, info.timestamp)
+        else:
+            ya_client.states_set(
+                device_id,
+                StateItem(
+                    actions_list=[
+                        DeviceCapabilityAction(device_id=device_id, capabilities=get_current_capabilities(device_info))
+                    ],
+                    excl=(),
+                    checked=True,
+                    mutated=True,
+                ),
+            )
+        return True
+
+    async def probe_group(device_id):
+        if (hub := representatives.get(device_id)) is None:
+            await probe(device_id)
+            return
+        probed = {device_id}
+        if not await probe(device_id):
+            if scheduler.failures(device_id) < topology.rotate_after:
+                return
+            if (alternate := topology.alternate(hub, down[hub])) is None or not await probe(alternate):
+                return
+            probed.add(alternate)
+        await asyncio.gather(*[probe(member) for member in down[hub] - probed])
+
+    quarantined = ya_client.quarantine_ids() & ya_client._ping
+    down = topology.update(quarantined)
+    grouped = set().union(*down.values())
+    representatives = {topology.representative(failed): hub for hub, failed in down.items()}
+
+    scheduler.sync((quarantined - grouped) | set(representatives))
+    results = await asyncio.gather(*[probe_group(device_id) for device_id in scheduler.due()], return_exceptions=True)
+
+    for hub in [key for key in quarantine_notifications if key.startswith("hub:") and key[4:] not in down]:
+        quarantine_notifications.pop(hub)
+    for hub, failed in down.items():
+        if not (items := [info for device_id in failed if (info := ya_client.quarantine_get(device_id)) is not None]):
+            continue
+        timestamp = min(info.timestamp for info in items)
+        if time.time() - timestamp > 3600 * (2 ** quarantine_notifications.get(f"hub:{hub}", 0)):
+            await storage.messages_queue.put(
+                {
+                    "message": f"{ya_client.names.get(hub, hub)}: {len(items)} devices, "
+                    f"{int(time.time() - timestamp) // 3600}h",
+                    "to_delete": True,
+                    "to_delete_timestamp": time.time() + 10 * MIN,
+                }
+            )
+            quarantine_notifications[f"hub:{hub}"] = quarantine_notifications.get(f"hub:{hub}", 0) + 1
+
+    for device_id in ya_client.quarantine_ids() & ya_client._ping - grouped:
+        if (info := ya_client.quarantine_get(device_id)) is None:
+            continue
+        if time.time() - info.timestamp > 3600 * (2 ** quarantine_notifications.get(device_id, 0)):
+            await storage.messages_queue.put(
+                {
+                    "message": f"{ya_client.names.get(device_id, device_id)}: "
+                    f"{int(time.time() - info.timestamp) // 3600}h",
+                    "to_delete": True,
+                    "to_delete_timestamp": time.time() + 10 * MIN,
+                }
+            )
+            quarantine_notifications[device_id] = quarantine_notifications.get(device_id, 0) + 1
 
     storage.put(SysSKeys.quarantine_notifications, quarantine_notifications)
 
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+
+    if (next_time := scheduler.next_time()) is not None:
+        return min(max(next_time - time.time(), 1), 10)
+
 
 @looper(10)
 async def detect_human():
     ya_client = YandexClient()
+    if not ya_client.snapshot_mode:
+        await ya_client.refresh_snapshot()
 
-    states_keys = copy.deepcopy(list(ya_client.states_keys()))
-    for device_id in states_keys:
-        if ya_client.states_in(device_id):
-            state = ya_client.states_get(device_id)
-            if state is not None and state.checked and not ya_client.quarantine_in(device_id):
-                try:
-                    await ya_client._check_devices_capabilities(
-                        state.actions_list, {device_id: state.excl}, err_retry=False, real_action=False
-                    )
-                except DeviceOffline:
-                    continue
-                except InfraCheckError:
-                    await asyncio.sleep(12)
-
-                    if ya_client.states_in(device_id):
-                        state2 = ya_client.states_get(device_id)
-                        if state != state2:
-                            continue
-
-                        try:
-                            await ya_client._check_devices_capabilities(
-                                state.actions_list, {device_id: state.excl}, err_retry=False, real_action=False
-                            )
-                        except DeviceOffline:
-                            continue
-                        except InfraCheckError as exc:
-                            await register_human(device_id, exc, state, time.time())
+    for device_id, (due, state) in list(ya_client._suspects.items()):
+        if due > time.time():
+            continue
+        ya_client._suspects.pop(device_id)
+        if (
+            not ya_client.states_in(device_id)
+            or ya_client.states_get(device_id) != state
+            or ya_client.quarantine_in(device_id)
+        ):
+            continue
+
+        try:
+            await ya_client._check_devices_capabilities(
+                state.actions_list, {device_id: state.excl}, err_retry=False, real_action=False
+            )
+        except DeviceOffline:
+            continue
+        except InfraCheckError as exc:
+            await register_human(device_id, exc, state, time.time())
+
+    for device_id in ya_client.take_changed():
+        if device_id in ya_client._suspects or not ya_client.states_in(device_id):
+            continue
+        state = ya_client.states_get(device_id)
+        if state is not None and state.checked and not ya_client.quarantine_in(device_id):
+            try:
+                await ya_client._check_devices_capabilities(
+                    state.actions_list, {device_id: state.excl}, err_retry=False, real_action=False
+                )
+            except DeviceOffline:
+                continue
+            except InfraCheckError:
+                ya_client._suspects[device_id] = (time.time() + 12, state)
+
+    if ya_client._suspects:
+        return min(max(min(due for due, _ in ya_client._suspects.values()) - time.time(), 1), 10)
@@ -1,15 +1,40 @@
 import asyncio
+import copy
+from contextlib import contextmanager
 from enum import Enum
-from typing import Union
-
-import aiofiles
-import yaml
+from typing import Iterable, Iterator, Union
 
+from smarthouse.storage_backends import StorageBackend, StorageError, make_backend
 from smarthouse.utils import Singleton
 
 
-class StorageError(Exception):
-    pass
+def _key_name(key: Union[Enum, str]) -> str:
+    return key.value if isinstance(key, Enum) else key
+
+
+class Transaction:
+    def __init__(self, storage: "Storage") -> None:
+        self._storage = storage
+        self._updates: dict = {}
+        self._deleted: set[str] = set()
+
+    def put(self, key: Union[Enum, str], value) -> None:
+        _key = _key_name(key)
+        self._updates[_key] = value
+        self._deleted.discard(_key)
+
+    def delete(self, key: Union[Enum, str]) -> None:
+        _key = _key_name(key)
+        self._updates.pop(_key, None)
+        self._deleted.add(_key)
+
+    def get(self, key: Union[Enum, str], default=0):
+        _key = _key_name(key)
+        if _key in self._deleted:
+            return default
+        if _key in self._updates:
+            return self._updates[_key]
+        return self._storage.get(_key, default)
 
 
 class Storage(metaclass=Singleton):
@@ -18,21 +43,29 @@ class Storage(metaclass=Singleton):
     _storage_name: str | None
     _s3_mode: bool
     _events: dict
+    _dirty: set[str]
+    _snapshot: dict | None
+    _backend: StorageBackend | None
 
     messages_queue: asyncio.Queue
     tasks: asyncio.Queue
     need_to_write: bool
 
-    async def init(self, storage_name: str | None, s3_mode=False):
+    async def init(
+        self, storage_name: str | None, s3_mode=False, backend: str = "file", storage_format: str | None = None
+    ):
         self._storage = {}
         self._storage_shadow = {}
         self._storage_name = storage_name
         self._s3_mode = s3_mode
         self._events = {}
-        if s3_mode:
-            from smarthouse.yandex_cloud import YandexCloudClient
-
-            self.cloud_client = YandexCloudClient()
+        self._dirty = set()
+        self._snapshot = None
+        if (previous := getattr(self, "_backend", None)) is not None:
+            previous.close()
+        self._backend = (
+            make_backend(storage_name, s3_mode, backend, storage_format) if storage_name is not None else None
+        )
         self._lock = asyncio.Lock()
 
         self.messages_queue = asyncio.Queue()
@@ -46,66 +79,80 @@ class Storage(metaclass=Singleton):
         to_delete = [k for k in self._storage.keys() if k.startswith("__")]
         for k in to_delete:
             self._storage.pop(k)
+            self._dirty.add(k)
         await self._write_storage(force=True)
 
     async def _read_storage(self) -> dict:
-        if self._storage_name is None:
+        if self._backend is None:
             return {}
-        for _ in range(10):
-            if not self._s3_mode:
-                async with aiofiles.open(f"./storage/{self._storage_name}", mode="rt") as f:
-                    content = await f.read()
-            else:
-                content = await self.cloud_client.get_bucket("home-bucket", self._storage_name)
-
-            if (isinstance(content, str) or isinstance(content, bytes)) and content:
-                data = yaml.safe_load(content)
-                if data:
-                    return data
-
-            await asyncio.sleep(0.1)
-
-        raise StorageError("empty data on read")
+        return await self._backend.read()
 
     async def refresh(self) -> None:
         self._storage = await self._read_storage()
+        self._snapshot = None
+
+    def _take_snapshot(self, dirty: set[str], force: bool) -> dict:
+        if force or self._snapshot is None:
+            self._snapshot = copy.deepcopy(self._storage)
+        else:
+            for key in dirty:
+                if key in self._storage:
+                    self._snapshot[key] = copy.deepcopy(self._storage[key])
+                else:
+                    self._snapshot.pop(key, None)
+        return dict(self._snapshot)
 
     async def _write_storage(self, force=False):
-        if self._storage_name is None:
+        if self._backend is None:
             return
         if not self._storage:
             raise StorageError("empty data on write")
         async with self._lock:
             if self.need_to_write or force:
-                if not self._s3_mode:
-                    async with aiofiles.open(f"./storage/{self._storage_name}", mode="wt") as f:
-                        await f.write(yaml.dump(self._storage))
-                else:
-                    await self.cloud_client.put_bucket("home-bucket", "storage.yaml", yaml.dump(self._storage))
+                dirty, self._dirty = self._dirty, set()
                 self.need_to_write = False
+                try:
+                    await self._backend.write(self._take_snapshot(dirty, force), dirty, force)
+                except Exception:
+                    self._dirty |= dirty
+                    self.need_to_write = True
+                    raise
+
+    def _apply(self, updates: dict, deleted: Iterable[str] = ()) -> None:
+        for _key, value in updates.items():
+            if self._storage.get(_key) is value:
+                self._dirty.add(_key)
+            elif self._storage.get(_key) != value:
+                self._storage[_key] = value
+                self._dirty.add(_key)
+                self.need_to_write = True
+        for _key in deleted:
+            if _key in self._storage:
+                self._storage.pop(_key)
+                self._dirty.add(_key)
+                self.need_to_write = True
+
+    @contextmanager
+    def transaction(self) -> Iterator[Transaction]:
+        transaction = Transaction(self)
+        yield transaction
+        self._apply(transaction._updates, transaction._deleted)
 
     def put(self, key: Union[Enum, str], value, shadow: bool = False):
-        _key: str = key.value if isinstance(key, Enum) else key
+        _key = _key_name(key)
         if not shadow:
-            if self._storage.get(_key) != value:
-                self._storage[_key] = value
-                self.need_to_write = True
+            self._apply({_key: value})
         else:
             self._storage_shadow[_key] = value
 
     def write_shadow(self):
-        for _key, value in self._storage_shadow.items():
-            self.put(_key, value)
+        self._apply(self._storage_shadow)
 
     def delete(self, key: Union[Enum, str]):
-        _key: str = key.value if isinstance(key, Enum) else key
-        if _key in self._storage.keys():
-            self._storage.pop(_key)
-            self.need_to_write = True
+        self._apply({}, (_key_name(key),))
 
     def get(self, key: Union[Enum, str], default=0):
-        _key: str = key.value if isinstance(key, Enum) else key
-        return self._storage.get(_key, default)
+        return self._storage.get(_key_name(key), default)
 
     def keys(self):
         return self._storage.keys()
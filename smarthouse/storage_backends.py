@@ -0,0 +1,410 @@
+import asyncio
+import gzip
+import json
+import logging
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+
+import aiofiles
+import yaml
+
+try:
+    from yaml import CDumper as Dumper
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import Dumper, SafeLoader
+
+logger = logging.getLogger("root")
+
+
+def dump_yaml(data: dict, **kwargs) -> str:
+    return yaml.dump(data, Dumper=Dumper, **kwargs)
+
+
+def load_yaml(content: str | bytes):
+    return yaml.load(content, Loader=SafeLoader)
+
+
+class StorageError(Exception):
+    pass
+
+
+class StorageFormat(ABC):
+    name = ""
+    extension = ""
+
+    @abstractmethod
+    def dump(self, data: dict) -> bytes:
+        pass
+
+    @abstractmethod
+    def load(self, content: bytes):
+        pass
+
+
+class YamlFormat(StorageFormat):
+    name = "yaml"
+    extension = ".yaml"
+
+    def dump(self, data: dict) -> bytes:
+        return dump_yaml(data).encode()
+
+    def load(self, content: bytes):
+        return load_yaml(content)
+
+
+class JsonGzFormat(StorageFormat):
+    name = "json.gz"
+    extension = ".json.gz"
+
+    def dump(self, data: dict) -> bytes:
+        return gzip.compress(json.dumps(data, separators=(",", ":")).encode(), compresslevel=6)
+
+    def load(self, content: bytes):
+        return json.loads(gzip.decompress(content))
+
+
+class MsgpackFormat(StorageFormat):
+    name = "msgpack"
+    extension = ".msgpack"
+
+    def dump(self, data: dict) -> bytes:
+        import msgpack
+
+        return msgpack.packb(data)
+
+    def load(self, content: bytes):
+        import msgpack
+
+        return msgpack.unpackb(content, strict_map_key=False)
+
+
+FORMATS: dict[str, type[StorageFormat]] = {
+    YamlFormat.name: YamlFormat,
+    JsonGzFormat.name: JsonGzFormat,
+    MsgpackFormat.name: MsgpackFormat,
+}
+
+
+def get_format(storage_name: str, storage_format: str | None = None) -> StorageFormat:
+    if storage_format is not None:
+        if storage_format not in FORMATS:
+            raise StorageError(f"unknown storage format {storage_format}")
+        return FORMATS[storage_format]()
+    for format_class in FORMATS.values():
+        if storage_name.endswith(format_class.extension):
+            return format_class()
+    return YamlFormat()
+
+
+class StorageBackend(ABC):
+    def __init__(self, storage_name: str, storage_format: StorageFormat | None = None) -> None:
+        self.storage_name = storage_name
+        self.format = storage_format or get_format(storage_name)
+
+        self.writes = 0
+        self.bytes_written = 0
+
+    @abstractmethod
+    async def read(self) -> dict:
+        pass
+
+    @abstractmethod
+    async def write(self, storage: dict, dirty: set[str], force: bool = False) -> None:
+        pass
+
+    async def _read_legacy(self) -> tuple[str, dict] | None:
+        for legacy in (f"./storage/{self.storage_name.split('.', 1)[0]}.yaml", "./storage/storage.yaml"):
+            if os.path.exists(legacy):
+                async with aiofiles.open(legacy, mode="rb") as f:
+                    return legacy, await asyncio.to_thread(load_yaml, await f.read())
+        return None
+
+    def close(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {"writes": self.writes, "bytes_written": self.bytes_written}
+
+    def reset_stats(self) -> None:
+        self.writes = 0
+        self.bytes_written = 0
+
+
+class BlobBackend(StorageBackend):
+    @abstractmethod
+    async def _read_content(self) -> bytes | None:
+        pass
+
+    async def read(self) -> dict:
+        for _ in range(10):
+            content = await self._read_content()
+            if (isinstance(content, str) or isinstance(content, bytes)) and content:
+                data = await asyncio.to_thread(self.format.load, content)
+                if data:
+                    return data
+
+            await asyncio.sleep(0.1)
+
+        raise StorageError("empty data on read")
+
+
+class FileBackend(BlobBackend):
+    def __init__(self, storage_name: str, storage_format: StorageFormat | None = None) -> None:
+        super().__init__(storage_name, storage_format)
+        self.path = f"./storage/{storage_name}"
+
+    async def _read_content(self) -> bytes | None:
+        async with aiofiles.open(self.path, mode="rb") as f:
+            return await f.read()
+
+    async def read(self) -> dict:
+        await self._migrate()
+        return await super().read()
+
+    async def _migrate(self) -> None:
+        if os.path.exists(self.path) or isinstance(self.format, YamlFormat):
+            return
+        if (result := await self._read_legacy()) is None:
+            return
+
+        legacy, data = result
+        await self._write_file(self.path, data)
+        os.replace(legacy, f"{legacy}.migrated")
+        logger.info(f"storage migrated from {legacy} to {self.path}")
+
+    async def _write_file(self, path: str, storage: dict) -> int:
+        content = await asyncio.to_thread(self.format.dump, storage)
+        async with aiofiles.open(f"{path}.tmp", mode="wb") as f:
+            await f.write(content)
+        os.replace(f"{path}.tmp", path)
+        return len(content)
+
+    async def write(self, storage: dict, dirty: set[str], force: bool = False) -> None:
+        self.bytes_written += await self._write_file(self.path, storage)
+        self.writes += 1
+
+
+class S3Backend(BlobBackend):
+    def __init__(self, storage_name: str, storage_format: StorageFormat | None = None) -> None:
+        super().__init__(storage_name, storage_format)
+        from smarthouse.yandex_cloud import YandexCloudClient
+
+        self.cloud_client = YandexCloudClient()
+        self.object_name = "storage.yaml" if isinstance(self.format, YamlFormat) else storage_name
+
+    async def _read_content(self) -> bytes | None:
+        return await self.cloud_client.get_bucket("home-bucket", self.storage_name)
+
+    async def read(self) -> dict:
+        await self._migrate()
+        return await super().read()
+
+    async def _migrate(self) -> None:
+        if isinstance(self.format, YamlFormat) or await self.cloud_client.bucket_has("home-bucket", self.object_name):
+            return
+        if not await self.cloud_client.bucket_has("home-bucket", "storage.yaml"):
+            return
+
+        data = await asyncio.to_thread(load_yaml, await self.cloud_client.get_bucket("home-bucket", "storage.yaml"))
+        content = await asyncio.to_thread(self.format.dump, data)
+        await self.cloud_client.put_bucket("home-bucket", self.object_name, content)
+        logger.info(f"storage migrated from storage.yaml to {self.object_name}")
+
+    async def write(self, storage: dict, dirty: set[str], force: bool = False) -> None:
+        content = await asyncio.to_thread(self.format.dump, storage)
+        await self.cloud_client.put_bucket("home-bucket", self.object_name, content)
+        self.writes += 1
+        self.bytes_written += len(content)
+
+
+class SqliteBackend(StorageBackend):
+    def __init__(self, storage_name: str, storage_format: StorageFormat | None = None) -> None:
+        super().__init__(storage_name, storage_format)
+        self.path = f"./storage/{storage_name}"
+        self._connection: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS storage (key TEXT PRIMARY KEY, value BLOB NOT NULL)")
+        return self._connection
+
+    def _read_all(self) -> dict:
+        rows = self._connect().execute("SELECT key, value FROM storage").fetchall()
+        return {key: self.format.load(value)[key] for key, value in rows}
+
+    def _upsert(self, storage: dict, keys: set[str], force: bool) -> int:
+        connection = self._connect()
+        rows = [(key, self.format.dump({key: storage[key]})) for key in sorted(keys) if key in storage]
+        if force:
+            deleted = [key for (key,) in connection.execute("SELECT key FROM storage") if key not in storage]
+        else:
+            deleted = [key for key in keys if key not in storage]
+
+        connection.execute("BEGIN")
+        try:
+            connection.executemany(
+                "INSERT INTO storage (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                rows,
+            )
+            connection.executemany("DELETE FROM storage WHERE key = ?", [(key,) for key in deleted])
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return sum(len(value) for _, value in rows)
+
+    async def read(self) -> dict:
+        if not os.path.exists(self.path) and (result := await self._read_legacy()) is not None:
+            legacy, data = result
+            await asyncio.to_thread(self._upsert, data, set(data), True)
+            os.replace(legacy, f"{legacy}.migrated")
+            logger.info(f"storage migrated from {legacy} to {self.path}")
+
+        if not (data := await asyncio.to_thread(self._read_all)):
+            raise StorageError("empty data on read")
+        return data
+
+    async def write(self, storage: dict, dirty: set[str], force: bool = False) -> None:
+        if not dirty and not force:
+            return
+        self.bytes_written += await asyncio.to_thread(self._upsert, storage, dirty, force)
+        self.writes += 1
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class JournalBackend(FileBackend):
+    def __init__(
+        self,
+        storage_name: str,
+        storage_format: StorageFormat | None = None,
+        compact_ratio: float = 1.0,
+        min_compact_size: int = 64 * 1024,
+    ) -> None:
+        super().__init__(storage_name, storage_format)
+        self.journal_path = f"{self.path}.journal"
+        self.compact_ratio = compact_ratio
+        self.min_compact_size = min_compact_size
+
+        self._snapshot_size = 0
+        self._journal_size = 0
+        self._compaction: asyncio.Task | None = None
+
+        self.compactions = 0
+        self.replayed = 0
+
+    async def read(self) -> dict:
+        data = await super().read()
+        self._snapshot_size = os.path.getsize(self.path)
+        self._journal_size = 0
+        for path in (f"{self.journal_path}.old", self.journal_path):
+            if not os.path.exists(path):
+                continue
+            async with aiofiles.open(path, mode="rt") as f:
+                content = await f.read()
+            if path == self.journal_path:
+                self._journal_size = len(content)
+            await asyncio.to_thread(self._replay, data, content)
+        return data
+
+    def _replay(self, data: dict, content: str) -> None:
+        try:
+            for record in yaml.load_all(content, Loader=SafeLoader):
+                if not isinstance(record, dict) or not record.get("end"):
+                    break
+                data.update(record["set"])
+                for key in record["delete"]:
+                    data.pop(key, None)
+                self.replayed += 1
+        except yaml.YAMLError:
+            pass
+
+    async def write(self, storage: dict, dirty: set[str], force: bool = False) -> None:
+        if force:
+            if self._compaction is not None:
+                await self._compaction
+            await asyncio.to_thread(self._rotate)
+            await self._compact(storage)
+            return
+        if not dirty:
+            return
+
+        record = {
+            "set": {key: storage[key] for key in sorted(dirty) if key in storage},
+            "delete": sorted(key for key in dirty if key not in storage),
+            "end": True,
+        }
+        content = await asyncio.to_thread(dump_yaml, record, explicit_start=True, sort_keys=False)
+        async with aiofiles.open(self.journal_path, mode="at") as f:
+            await f.write(content)
+        self.writes += 1
+        self.bytes_written += len(content)
+        self._journal_size += len(content)
+
+        if self._compaction is None and self._journal_size > max(
+            self.min_compact_size, self.compact_ratio * self._snapshot_size
+        ):
+            await asyncio.to_thread(self._rotate)
+            self._compaction = asyncio.create_task(self._compact_in_background(storage))
+
+    def _rotate(self) -> None:
+        if os.path.exists(f"{self.journal_path}.old") and os.path.exists(self.journal_path):
+            with open(self.journal_path, "rt") as journal, open(f"{self.journal_path}.old", "at") as old:
+                old.write(journal.read())
+            os.remove(self.journal_path)
+        elif os.path.exists(self.journal_path):
+            os.replace(self.journal_path, f"{self.journal_path}.old")
+        self._journal_size = 0
+
+    async def _compact_in_background(self, snapshot: dict) -> None:
+        try:
+            await self._compact(snapshot)
+        except Exception as exc:
+            logger.exception(exc)
+
+    async def _compact(self, snapshot: dict) -> None:
+        try:
+            size = await self._write_file(self.path, snapshot)
+            if os.path.exists(f"{self.journal_path}.old"):
+                os.remove(f"{self.journal_path}.old")
+            self._snapshot_size = size
+            self.bytes_written += size
+            self.compactions += 1
+        finally:
+            self._compaction = None
+
+    def stats(self) -> dict:
+        return super().stats() | {
+            "journal_size": self._journal_size,
+            "snapshot_size": self._snapshot_size,
+            "compactions": self.compactions,
+        }
+
+    def reset_stats(self) -> None:
+        super().reset_stats()
+        self.compactions = 0
+
+
+def make_backend(
+    storage_name: str, s3_mode: bool = False, backend: str = "file", storage_format: str | None = None
+) -> StorageBackend:
+    format_ = get_format(storage_name, storage_format)
+    if s3_mode:
+        if backend != "file":
+            raise StorageError(f"storage backend {backend} is not supported in s3 mode")
+        return S3Backend(storage_name, format_)
+    if backend == "journal":
+        return JournalBackend(storage_name, format_)
+    if backend == "file":
+        return FileBackend(storage_name, format_)
+    if backend == "sqlite":
+        return SqliteBackend(storage_name, format_)
+    raise StorageError(f"unknown storage backend {backend}")
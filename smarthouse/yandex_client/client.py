@@ -6,7 +6,6 @@ import time
 from typing import Any, Optional
 
 import aiohttp
-from async_lru import alru_cache
 
 from smarthouse.base_client.client import BaseClient
 from smarthouse.base_client.exceptions import (
@@ -16,7 +15,11 @@ from smarthouse.base_client.exceptions import (
     InfraServerTimeoutError,
     ProgrammingError,
 )
+from smarthouse.base_client.pinger import Pinger
+from smarthouse.base_client.rate_limiter import AdaptiveRateLimiter
+from smarthouse.base_client.state_cache import StateCache
 from smarthouse.base_client.utils import retry
+from smarthouse.yandex_client.events import EventBus, EventType, diff_device_info
 from smarthouse.yandex_client.models import (
     Action,
     ActionRequestModel,
@@ -24,8 +27,10 @@ from smarthouse.yandex_client.models import (
     DeviceActionResponse,
     DeviceCapabilityAction,
     DeviceInfoResponse,
+    StateCallback,
     StateItem,
 )
+from smarthouse.yandex_client.poll_scheduler import PollScheduler
 from smarthouse.yandex_client.utils import get_current_capabilities
 
 logger = logging.getLogger("root")
@@ -49,42 +54,123 @@ DEFAULTS: dict[str, dict[str, Any]] = {  # todo: move to devices
 class YandexClient(BaseClient[DeviceInfoResponse, ActionRequestModel]):
     _states: dict[str, StateItem]
     _last: dict[str, tuple[DeviceInfoResponse, float]]
+    _responses: StateCache[dict]
+    _snapshot_stats: dict[str, int]
     base_url: str
     client: aiohttp.ClientSession
     prod: bool
+    snapshot_mode: bool = False
+    snapshot_max_age: float
+    adaptive_polling: bool = False
+    push_max_age: float = 60
+    poll_scheduler: PollScheduler
+    events: EventBus
+    _observed: dict[str, DeviceInfoResponse]
+    _push_stats: dict[str, int]
+    _pushed: set[str]
+
+    def init(
+        self,
+        yandex_token: str = "",
+        prod: bool = False,
+        snapshot_mode: bool = False,
+        snapshot_max_age: float = 3,
+        write_through: bool = False,
+        keep_alive: bool = False,
+        limit_per_host: int = 10,
+        warm_up_connections: int = 2,
+        base_url: str = "https://api.iot.yandex.net",
+        get_rate: float = 100,
+        post_rate: float = 50,
+        adaptive_polling: bool = False,
+        push_max_age: float = 60,
+        ping_concurrency: int = 10,
+    ) -> None:
+        self.base_init()
+        self.pinger = Pinger(concurrency=ping_concurrency)
+
+        self.base_url = base_url
+        self.keep_alive = keep_alive
+        self.warm_up_connections = warm_up_connections
+        self._connection_stats: dict[str, int] = {"created": 0, "reused": 0}
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(self._on_connection_create_end)  # type: ignore[arg-type]
+        trace_config.on_connection_reuseconn.append(self._on_connection_reuseconn)  # type: ignore[arg-type]
 
-    def init(self, yandex_token: str = "", prod: bool = False) -> None:
-        super().base_init()
-
-        self.base_url = "https://api.iot.yandex.net"
         self.client = aiohttp.ClientSession(
             base_url=self.base_url,
             headers={"Authorization": f"Bearer {yandex_token}"},
-            connector=aiohttp.TCPConnector(
-                ssl=False,
-                limit=None,  # type: ignore[arg-type]
-                force_close=True,
-                enable_cleanup_closed=True,
-            ),
+            connector=self._connector(keep_alive, limit_per_host),
             timeout=aiohttp.ClientTimeout(total=3),
+            trace_configs=[trace_config],
         )
         self.china_client = aiohttp.ClientSession(
             base_url=self.base_url,
             headers={"Authorization": f"Bearer {yandex_token}"},
-            connector=aiohttp.TCPConnector(
-                ssl=False,
-                limit=None,  # type: ignore[arg-type]
-                force_close=True,
-                enable_cleanup_closed=True,
-            ),
+            connector=self._connector(keep_alive, limit_per_host),
             timeout=aiohttp.ClientTimeout(total=60),
+            trace_configs=[trace_config],
         )
         self.prod = prod
 
         self._states: dict[str, StateItem] = {}
         self._last: dict[str, DeviceInfoResponse] = {}
 
-    @alru_cache(maxsize=1024, ttl=600)  # todo: remove lru
+        self.write_through = write_through
+        self.snapshot_mode = snapshot_mode
+        self.snapshot_max_age = snapshot_max_age
+        self._snapshot_stats: dict[str, int] = {"refreshes": 0, "devices": 0}
+        self._responses: StateCache[dict] = StateCache(maxsize=64)
+        self.adaptive_polling = adaptive_polling
+        self.push_max_age = push_max_age
+        self.poll_scheduler = PollScheduler()
+        self._limiters = {"GET": AdaptiveRateLimiter(get_rate), "POST": AdaptiveRateLimiter(post_rate)}
+
+    def base_init(self) -> None:
+        super().base_init()
+        self.events = EventBus()
+        self._observed = {}
+        self._push_stats = {"callbacks": 0, "devices": 0, "unknown": 0}
+        self._pushed: set[str] = set()
+
+    @staticmethod
+    def _connector(keep_alive: bool, limit_per_host: int) -> aiohttp.TCPConnector:
+        if keep_alive:
+            return aiohttp.TCPConnector(
+                ssl=False,
+                limit=0,
+                limit_per_host=limit_per_host,
+                use_dns_cache=True,
+                ttl_dns_cache=300,
+                keepalive_timeout=60,
+            )
+        return aiohttp.TCPConnector(
+            ssl=False,
+            limit=None,  # type: ignore[arg-type]
+            force_close=True,
+            enable_cleanup_closed=True,
+        )
+
+    async def _on_connection_create_end(self, session, context, params) -> None:
+        self._connection_stats["created"] += 1
+
+    async def _on_connection_reuseconn(self, session, context, params) -> None:
+        self._connection_stats["reused"] += 1
+
+    async def warm_up(self) -> None:
+        if not self.keep_alive:
+            return None
+
+        async def open_connection(client: aiohttp.ClientSession) -> None:
+            try:
+                async with client.get("/") as response:
+                    await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                logger.debug(f"warm up failed: {exc}")
+
+        await asyncio.gather(*[open_connection(self.client) for _ in range(self.warm_up_connections)])
+
     async def _request(
         self,
         method: str,
@@ -92,7 +178,6 @@ class YandexClient(BaseClient[DeviceInfoResponse, ActionRequestModel]):
         data: Optional[str] = None,
         use_china_client=False,
         calls: tuple[tuple[str, str], ...] = (),
-        ttl_hash: float | None = None,
     ) -> dict:
         for device_id, call in calls:
             if device_id not in self._calls_get:
@@ -107,6 +192,10 @@ class YandexClient(BaseClient[DeviceInfoResponse, ActionRequestModel]):
         if not self.prod and method == "POST":
             logger.debug(path)
 
+        limiter = self._limiters.get(method)
+        if limiter is not None:
+            await limiter.acquire()
+
         start = time.time()
         response_data_text = None
         response_data_json = None
@@ -139,6 +228,8 @@ class YandexClient(BaseClient[DeviceInfoResponse, ActionRequestModel]):
                 debug_str=f"{method} {path} {data}",
             ) from exc
         except aiohttp.ClientResponseError as exc:
+            if limiter is not None and (exc.status == 429 or exc.status // 100 == 5):
+                limiter.on_failure()
             if exc.status == 404:
                 raise DeviceOffline(
                     f"404 error: response: {response_data_json}, exception: {exc}",
@@ -146,7 +237,7 @@ class YandexClient(BaseClient[DeviceInfoResponse, ActionRequestModel]):
                     device_ids=[],
                     debug_str=f"{method} {path} {data}",
                 ) from exc
-            if exc.status // 100 == 4:
+            if exc.status // 100 == 4 and exc.status != 429:
                 raise ProgrammingError(
                     f"Client response error: response: {response_data_json}, exception: {exc}",
                     self.prod,
@@ -158,18 +249,25 @@ class YandexClient(BaseClient[DeviceInfoResponse, ActionRequestModel]):
                 debug_str=f"{method} {path} {data}",
             ) from exc
         except aiohttp.ClientError as exc:
+            if limiter is not None:
+                limiter.on_failure()
             raise InfraServerError(
                 f"Client error: response: {response_data_json}, exception: {exc}",
                 self.prod,
                 debug_str=f"{method} {path} {data}",
             ) from exc
         except asyncio.TimeoutError as exc:
+            if limiter is not None:
+                limiter.on_failure()
             raise InfraServerTimeoutError(
                 "Yandex server timeout",
                 self.prod,
                 debug_str=f"{method} {path} {data}",
             ) from exc
 
+        if limiter is not None:
+            limiter.on_success()
+
         if path not in self._stats:
             self._stats[path] = 0
         self._stats[path] += time.time() - start
@@ -182,10 +280,6 @@ class YandexClient(BaseClient[DeviceInfoResponse, ActionRequestModel]):
             )
         return response_data_json
 
-    @staticmethod
-    def get_ttl_hash(seconds: float | None):
-        return int(time.time() / seconds) if seconds is not None else time.time()
-
     async def request(
         self,
         method: str,
@@ -193,32 +287,116 @@ class YandexClient(BaseClient[DeviceInfoResponse, ActionRequestModel]):
         data: Optional[dict] = None,
         use_china_client: bool = False,
         calls: Optional[dict] = None,
-        hash_seconds: float | None = 1,
+        hash_seconds: float | None = None,
     ) -> dict:
-        ttl_hash = self.get_ttl_hash(hash_seconds)
+        if method == "GET" and (cached := self._responses.get(path, hash_seconds)) is not None:
+            return cached
         calls_list = tuple(sorted((calls or {}).items()))
-        res = await self._request(method, path, json.dumps(data), use_china_client, calls_list, ttl_hash)
-        if hash_seconds is None:
-            self._request.cache_invalidate(method, path, json.dumps(data), use_china_client, calls_list, ttl_hash)
+        res = await self._request(method, path, json.dumps(data), use_china_client, calls_list)
+        if method == "GET" and hash_seconds is not None:
+            self._responses.set(path, res)
         return res
 
     @retry
     async def info(self, hash_seconds: float | None = 1) -> dict:
         return await self.request("GET", "/user/info", hash_seconds=hash_seconds)
 
+    async def refresh_snapshot(self) -> None:
+        generation = self._cache.generation()
+        timestamp = time.time()
+        response = await self.info(hash_seconds=None)
+        for device in response.get("devices", []):
+            if (device_id := device.get("id")) not in self.names or self.quarantine_in(device_id):
+                continue
+            try:
+                device_info = self._parse_device_info(
+                    device_id,
+                    {"status": response.get("status"), "request_id": response.get("request_id"), "state": "online"}
+                    | device,
+                    dont_log=True,
+                    err_retry=False,
+                )
+            except (DeviceOffline, InfraServerError):
+                continue
+            if not self._cache.set(device_id, device_info, timestamp, generation=generation):
+                continue
+            self.last_set(device_id, device_info)
+            self._on_device_info(device_id, device_info)
+            if self.adaptive_polling:
+                self.poll_scheduler.observe(device_id, device_info)
+            self._snapshot_stats["devices"] += 1
+        self._snapshot_stats["refreshes"] += 1
+
+    def apply_state_callback(self, callback: StateCallback) -> int:
+        applied = 0
+        timestamp = time.time()
+        for device in callback.payload.devices:
+            if (base := self._observed.get(device.id)) is None:
+                self._push_stats["unknown"] += 1
+                continue
+            device_info = base.model_copy(deep=True)
+            for item in device.capabilities:
+                instance = item.state.get("instance")
+                for capability in device_info.capabilities:
+                    if capability.type == item.type and capability.parameters.get("instance", instance) == instance:
+                        capability.state = item.state
+                        capability.last_updated = callback.ts
+            for item in device.properties:
+                for response_property in device_info.properties:
+                    if response_property.parameters.get("instance") == item.state.get("instance"):
+                        response_property.state = item.state
+                        response_property.last_updated = callback.ts
+            self._cache.invalidate(device.id)
+            self._cache.set(device.id, device_info, timestamp)
+            self.last_set(device.id, device_info)
+            self._on_device_info(device.id, device_info)
+            self._pushed.add(device.id)
+            applied += 1
+        self._push_stats["callbacks"] += 1
+        self._push_stats["devices"] += applied
+        return applied
+
+    def _on_device_info(self, device_id: str, result: DeviceInfoResponse) -> None:
+        previous = self._observed.get(device_id)
+        self._observed[device_id] = result
+        if previous is None:
+            self._changed.add(device_id)
+        if previous is None or previous is result:
+            return None
+        for event in diff_device_info(previous, result):
+            if event.type == EventType.capability:
+                self._changed.add(device_id)
+            self.events.publish(event)
+
+    def _cache_max_age(self, device_id: str, hash_seconds: float | None = 1) -> float | None:
+        if hash_seconds is None:
+            return None
+        max_age = max(hash_seconds, self.snapshot_max_age) if self.snapshot_mode else hash_seconds
+        if device_id in self._pushed:
+            max_age = max(max_age, self.push_max_age)
+        if self.adaptive_polling and (item := self._cache.peek(device_id)) is not None:
+            return self.poll_scheduler.max_age(device_id, item.timestamp, max_age)
+        return max_age
+
     @retry
     async def _device_info(
         self, device_id: str, dont_log: bool = False, err_retry: bool = True, hash_seconds: float | None = 1
     ) -> DeviceInfoResponse:
+        response = await self._device_info_request(device_id, dont_log, err_retry)
+        device = self._parse_device_info(device_id, response, dont_log, err_retry)
+        if self.adaptive_polling:
+            self.poll_scheduler.observe(device_id, device)
+        return device
+
+    async def _device_info_request(self, device_id: str, dont_log: bool = False, err_retry: bool = True) -> dict:
         use_china_client = self._use_china_client.get(device_id, False)
         calls = {device_id: "get"}
         try:
-            response = await self.request(
+            return await self.request(
                 "GET",
                 f"/devices/{device_id}",
                 use_china_client=use_china_client,
                 calls=calls,
-                hash_seconds=hash_seconds,
             )
         except ProgrammingError as exc:
             exc.dont_log = False
@@ -244,6 +422,10 @@ class YandexClient(BaseClient[DeviceInfoResponse, ActionRequestModel]):
                 dont_log=False,
                 err_retry=err_retry,
             ) from exc
+
+    def _parse_device_info(
+        self, device_id: str, response: dict, dont_log: bool = False, err_retry: bool = True
+    ) -> DeviceInfoResponse:
         try:
             device = DeviceInfoResponse(**response)
         except ValueError as exc:
@@ -283,13 +465,19 @@ class YandexClient(BaseClient[DeviceInfoResponse, ActionRequestModel]):
         return device
 
     async def device_info(
-        self, device_id: str, ignore_quarantine=False, process_last=False, hash_seconds: float | None = 1
+        self,
+        device_id: str,
+        ignore_quarantine=False,
+        process_last=False,
+        hash_seconds: float | None = 1,
+        optimistic: bool = True,
     ) -> DeviceInfoResponse | None:
         result = await super().device_info(
             device_id=device_id,
             ignore_quarantine=ignore_quarantine,
             process_last=process_last,
             hash_seconds=hash_seconds,
+            optimistic=optimistic,
         )
         # if (device_id not in self.names or self.names[device_id] == "") and result is not None:
         #     self.register_device(device_id, result.name)
@@ -320,7 +508,6 @@ class YandexClient(BaseClient[DeviceInfoResponse, ActionRequestModel]):
                 data=data.model_dump(),
                 use_china_client=use_china_client,
                 calls=calls,
-                hash_seconds=None,
             )
         except ProgrammingError as exc:
             exc.device_ids = [device.id for device in data.devices]
@@ -376,6 +563,20 @@ class YandexClient(BaseClient[DeviceInfoResponse, ActionRequestModel]):
     def device_from_action(self, action: DeviceCapabilityAction):
         return Device(id=action.device_id, actions=self.get_actions(action.capabilities))
 
+    def optimistic_device_info(self, action: DeviceCapabilityAction) -> DeviceInfoResponse | None:
+        if not self.last_in(action.device_id):
+            return None
+        device_info = self.last_get(action.device_id)[0].model_copy(deep=True)
+        for capability_type, instance, value in action.capabilities:
+            for capability in device_info.capabilities:
+                if (
+                    capability.type == f"devices.capabilities.{capability_type}"
+                    and capability.parameters.get("instance", instance) == instance
+                ):
+                    capability.state = {"instance": instance, "value": value}
+                    capability.last_updated = time.time()
+        return device_info
+
     async def _check_devices_capabilities(
         self,
         actions_list: list[DeviceCapabilityAction],
@@ -406,7 +607,7 @@ class YandexClient(BaseClient[DeviceInfoResponse, ActionRequestModel]):
                 patched_actions_list.append(action)
 
         device_ids = [action.device_id for action in patched_actions_list if action is not None]
-        tasks = [self.device_info(device_id) for device_id in device_ids]
+        tasks = [self.device_info(device_id, optimistic=False) for device_id in device_ids]
         devices_info = await asyncio.gather(*tasks)
         devices = {device_ids[i]: device_info for i, device_info in enumerate(devices_info)}
 
@@ -480,7 +681,7 @@ class YandexClient(BaseClient[DeviceInfoResponse, ActionRequestModel]):
 
     @retry
     async def run_scenario(self, scenario_id: str) -> dict:
-        return await self.request("POST", f"/scenarios/{scenario_id}/actions", hash_seconds=None)
+        return await self.request("POST", f"/scenarios/{scenario_id}/actions")
 
     @retry
     async def group_info(self, group_id: str, hash_seconds: float | None = 1) -> dict:
@@ -489,7 +690,7 @@ class YandexClient(BaseClient[DeviceInfoResponse, ActionRequestModel]):
     @retry
     async def group_actions(self, group_id, actions) -> dict:
         data = {"actions": actions}
-        return await self.request("POST", f"/groups/{group_id}/actions", data=data, hash_seconds=None)
+        return await self.request("POST", f"/groups/{group_id}/actions", data=data)
 
     async def check_property(
         self, device_id: str, property_name: str, process_last=False, hash_seconds: float | None = 1
@@ -1,4 +1,3 @@
-import asyncio
 import datetime
 import functools
 import logging
@@ -8,11 +7,14 @@ from typing import Any, List, Optional
 from pydantic import BaseModel, Field
 
 from smarthouse.base_client.exceptions import InfraCheckError
+from smarthouse.base_client.histogram import Histogram
 from smarthouse.storage import Storage
 from smarthouse.storage_keys import SysSKeys
 from smarthouse.utils import Singleton
 from smarthouse.yandex_client.client import YandexClient
+from smarthouse.yandex_client.events import DeviceEvent, EventType
 from smarthouse.yandex_client.models import DeviceCapabilityAction
+from smarthouse.yandex_client.queues import Lane, LanesQueue, supersedes
 
 logger = logging.getLogger("root")
 
@@ -45,10 +47,15 @@ class Action:
         return await run([self], check=check, lock_level=lock_level, lock=lock, feature_checkable=feature_checkable)
 
     async def run_async(
-        self, check: bool = True, lock_level=0, lock: datetime.timedelta | None = None, feature_checkable=False
+        self,
+        check: bool = True,
+        lock_level=0,
+        lock: datetime.timedelta | None = None,
+        feature_checkable=False,
+        lane: Lane = Lane.normal,
     ):
         return await run_async(
-            [self], check=check, lock_level=lock_level, lock=lock, feature_checkable=feature_checkable
+            [self], check=check, lock_level=lock_level, lock=lock, feature_checkable=feature_checkable, lane=lane
         )
 
 
@@ -68,19 +75,7 @@ async def run(
             lock=lock,
             feature_checkable=feature_checkable,  # todo: check feature_checkable after specified timeout
         )
-        begin = ""
-        if len(actions) > 1 and any(action.debug_log for action in actions):
-            logger.debug(f"{len(actions)} actions:")
-            begin = "    "
-        for action in actions:
-            if action.debug_log:
-                logger.debug(
-                    f"{begin}{action.device_name} :: "
-                    + ", ".join(
-                        f"{capability_name}.{capability_instance}:{capability_value}"
-                        for capability_name, capability_instance, capability_value in action.action_dict().capabilities
-                    )
-                )
+        _debug_log_actions(actions)
         return res
     except Exception as exc:
         raise exc
@@ -88,10 +83,72 @@ async def run(
         pass
 
 
+def _debug_log_actions(actions: list[Action]):
+    begin = ""
+    if len(actions) > 1 and any(action.debug_log for action in actions):
+        logger.debug(f"{len(actions)} actions:")
+        begin = "    "
+    for action in actions:
+        if action.debug_log:
+            logger.debug(
+                f"{begin}{action.device_name} :: "
+                + ", ".join(
+                    f"{capability_name}.{capability_instance}:{capability_value}"
+                    for capability_name, capability_instance, capability_value in action.action_dict().capabilities
+                )
+            )
+
+
+async def run_batch(tasks: list[dict]):
+    kept: dict[str, list[tuple[int, Action]]] = {}
+    for i, task in enumerate(tasks):
+        for action in task["actions"]:
+            previous = kept.setdefault(action.device_id, [])
+            previous[:] = [(j, old_action) for j, old_action in previous if not supersedes(tasks[j], task)]
+            previous.append((i, action))
+
+    rounds = {id(action): r for actions in kept.values() for r, (_, action) in enumerate(actions)}
+    batches: list[dict[int, list[Action]]] = []
+    for i, task in enumerate(tasks):
+        for action in task["actions"]:
+            if (r := rounds.get(id(action))) is None:
+                continue
+            while len(batches) <= r:
+                batches.append({})
+            batches[r].setdefault(i, []).append(action)
+
+    run_queues_set = RunQueuesSet()
+    run_queues_set.merged += sum(len(task["actions"]) for task in tasks) - len(rounds)
+
+    ya_client = YandexClient()
+    for batch in batches:
+        batch_actions = [action for actions in batch.values() for action in actions]
+        run_queues_set.batch_sizes.add(len(batch_actions))
+        await ya_client.change_devices_capabilities_batch(
+            [
+                {
+                    "actions_list": [action.action_dict() for action in actions],
+                    "check": tasks[i].get("check", True),
+                    "excl": {action.device_id: action.excl for action in actions},
+                    "lock_level": tasks[i].get("lock_level", 0),
+                    "lock": tasks[i].get("lock"),
+                    "feature_checkable": tasks[i].get("feature_checkable", False),
+                }
+                for i, actions in batch.items()
+            ]
+        )
+        _debug_log_actions(batch_actions)
+
+
 class RunQueuesSet(metaclass=Singleton):
-    def init(self):
-        self.run = asyncio.Queue()
-        self.check_and_run = asyncio.Queue()
+    def init(self, batch_window: float | None = None, batch_max_size: int = 50):
+        self.run = LanesQueue(supersede=True)
+        self.check_and_run = LanesQueue()
+        self.batch_window = batch_window
+        self.batch_max_size = batch_max_size
+
+        self.batch_sizes = Histogram()
+        self.merged = 0
 
 
 async def run_async(
@@ -100,6 +157,7 @@ async def run_async(
     lock_level=0,
     lock: datetime.timedelta | None = None,
     feature_checkable=False,
+    lane: Lane = Lane.normal,
 ):
     if lock is not None:
         for action in actions:
@@ -111,7 +169,8 @@ async def run_async(
             "lock_level": lock_level,
             "lock": lock,
             "feature_checkable": feature_checkable,
-        }
+        },
+        lane,
     )
     storage = Storage()
     storage.put(SysSKeys.max_run_queue_size, max(storage.get(SysSKeys.max_run_queue_size), RunQueuesSet().run.qsize()))
@@ -136,11 +195,12 @@ async def check_and_run_async(
     actions: list[Action],
     lock_level=0,
     lock: datetime.timedelta | None = None,
+    lane: Lane = Lane.normal,
 ):
     if lock is not None:
         for action in actions:
             YandexClient().locks_set(action.device_id, time.time() + lock.total_seconds(), level=lock_level)
-    await RunQueuesSet().check_and_run.put({"actions": actions, "lock_level": lock_level, "lock": lock})
+    await RunQueuesSet().check_and_run.put({"actions": actions, "lock_level": lock_level, "lock": lock}, lane)
     storage = Storage()
     storage.put(
         SysSKeys.max_check_and_run_queue_size,
@@ -164,6 +224,7 @@ class Device:
         use_china_client=False,
         outdated: bool = False,
         debug_log=False,
+        hub: str | None = None,
     ):
         self.device_id = device_id
         self.name = name
@@ -171,7 +232,9 @@ class Device:
         self.excl: tuple[tuple[str, str], ...] = ()
         self.debug_log = debug_log
 
-        self.ya_client.register_device(self.device_id, self.name, ping, human_time_func, outdated, use_china_client)
+        self.ya_client.register_device(
+            self.device_id, self.name, ping, human_time_func, outdated, use_china_client, hub=hub
+        )
 
     async def info(self, hash_seconds: float | None = 1):
         return await self.ya_client.device_info(self.device_id, hash_seconds=hash_seconds)
@@ -190,6 +253,11 @@ class Device:
             self.device_id, property_name, process_last=process_last, hash_seconds=hash_seconds
         )
 
+    async def next_event(
+        self, types: tuple[EventType, ...] | None = None, timeout: float | None = None
+    ) -> DeviceEvent | None:
+        return await self.ya_client.events.wait_for(self.device_id, types, timeout)
+
     def in_quarantine(self):
         return self.ya_client.quarantine_in(self.device_id)
 
@@ -239,6 +307,9 @@ class MotionSensor(LuxSensor):
         response = await self.check_property("motion", hash_seconds=hash_seconds)
         return time.time() - response[1]
 
+    async def next_motion(self, timeout: float | None = None) -> DeviceEvent | None:
+        return await self.next_event((EventType.motion,), timeout)
+
 
 class Door(Device):
     async def open_time(self, hash_seconds: float | None = 1):
@@ -249,6 +320,12 @@ class Door(Device):
         response = await self.check_property("open", hash_seconds=hash_seconds)
         return response[0] == "closed"
 
+    async def next_open(self, timeout: float | None = None) -> DeviceEvent | None:
+        return await self.next_event((EventType.opened,), timeout)
+
+    async def next_close(self, timeout: float | None = None) -> DeviceEvent | None:
+        return await self.next_event((EventType.closed,), timeout)
+
 
 class HumiditySensor(Device):
     @make_response
@@ -385,6 +462,9 @@ class Button(ControlDevice):
         response = await self.check_property("button", hash_seconds=hash_seconds)
         return response
 
+    async def next_click(self, timeout: float | None = None) -> DeviceEvent | None:
+        return await self.next_event((EventType.button,), timeout)
+
 
 class Curtain(Device):
     def open(self, open=100) -> Action:
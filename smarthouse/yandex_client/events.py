@@ -0,0 +1,145 @@
+import asyncio
+from enum import Enum
+from typing import Any, Iterable, NamedTuple
+
+from smarthouse.yandex_client.models import DeviceInfoResponse
+
+
+class EventType(str, Enum):
+    motion = "motion"
+    opened = "opened"
+    closed = "closed"
+    button = "button"
+    property = "property"
+    capability = "capability"
+
+
+class DeviceEvent(NamedTuple):
+    device_id: str
+    type: EventType
+    instance: str
+    value: Any
+    timestamp: float
+
+
+def _property_event_type(instance: str, value: Any) -> EventType:
+    if instance == "motion" and value == "detected":
+        return EventType.motion
+    if instance == "open":
+        return EventType.opened if value == "opened" else EventType.closed
+    if instance == "button":
+        return EventType.button
+    return EventType.property
+
+
+def diff_device_info(previous: DeviceInfoResponse, current: DeviceInfoResponse) -> list[DeviceEvent]:
+    events = []
+
+    previous_properties = {item.parameters.get("instance"): item for item in previous.properties}
+    for item in current.properties:
+        instance = item.parameters.get("instance", "")
+        value = item.state.get("value") if item.state else None
+        if (old := previous_properties.get(instance)) is None:
+            continue
+        old_value = old.state.get("value") if old.state else None
+        if item.type == "devices.properties.event":
+            if item.last_updated <= old.last_updated and value == old_value:
+                continue
+        elif value == old_value:
+            continue
+        events.append(
+            DeviceEvent(current.id, _property_event_type(instance, value), instance, value, item.last_updated)
+        )
+
+    previous_capabilities = {(item.type, item.parameters.get("instance")): item for item in previous.capabilities}
+    for capability in current.capabilities:
+        key = (capability.type, capability.parameters.get("instance"))
+        if (old_capability := previous_capabilities.get(key)) is None:
+            continue
+        if capability.state != old_capability.state:
+            events.append(
+                DeviceEvent(
+                    current.id,
+                    EventType.capability,
+                    capability.state.get("instance", ""),
+                    capability.state.get("value"),
+                    capability.last_updated,
+                )
+            )
+
+    return events
+
+
+class Subscription:
+    def __init__(
+        self, bus: "EventBus", device_id: str | None = None, types: Iterable[EventType] | None = None, maxsize=100
+    ) -> None:
+        self.bus = bus
+        self.device_id = device_id
+        self.types = set(types) if types is not None else None
+        self.queue: asyncio.Queue[DeviceEvent] = asyncio.Queue(maxsize=maxsize)
+
+    def match(self, event: DeviceEvent) -> bool:
+        return (self.device_id is None or self.device_id == event.device_id) and (
+            self.types is None or event.type in self.types
+        )
+
+    async def get(self) -> DeviceEvent:
+        return await self.queue.get()
+
+    def close(self) -> None:
+        self.bus.unsubscribe(self)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> DeviceEvent:
+        return await self.queue.get()
+
+
+class EventBus:
+    def __init__(self) -> None:
+        self._subscriptions: list[Subscription] = []
+
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, device_id: str | None = None, types: Iterable[EventType] | None = None) -> Subscription:
+        subscription = Subscription(self, device_id, types)
+        self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+
+    def watched(self) -> set[str | None]:
+        return {subscription.device_id for subscription in self._subscriptions}
+
+    def publish(self, event: DeviceEvent) -> None:
+        self.published += 1
+        for subscription in self._subscriptions:
+            if not subscription.match(event):
+                continue
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.dropped += 1
+
+    async def wait_for(
+        self, device_id: str | None = None, types: Iterable[EventType] | None = None, timeout: float | None = None
+    ) -> DeviceEvent | None:
+        subscription = self.subscribe(device_id, types)
+        try:
+            return await asyncio.wait_for(subscription.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            subscription.close()
+
+    def stats(self) -> dict:
+        return {
+            "subscriptions": len(self._subscriptions),
+            "published": self.published,
+            "dropped": self.dropped,
+        }
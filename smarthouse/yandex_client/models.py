@@ -81,6 +81,27 @@ class DeviceActionResponse(BaseModel):
     devices: list[DeviceResponse]
 
 
+class CallbackState(BaseModel):
+    type: str
+    state: dict
+
+
+class CallbackDevice(BaseModel):
+    id: str
+    capabilities: list[CallbackState] = []
+    properties: list[CallbackState] = []
+
+
+class CallbackPayload(BaseModel):
+    user_id: str = ""
+    devices: list[CallbackDevice]
+
+
+class StateCallback(BaseModel):
+    ts: float
+    payload: CallbackPayload
+
+
 class StateItem(BaseModel):
     checked: bool = False
     actions_list: list
@@ -0,0 +1,50 @@
+import time
+
+from smarthouse.utils import MIN
+from smarthouse.yandex_client.models import DeviceInfoResponse
+
+EVENT_PROPERTY = "devices.properties.event"
+
+
+class PollScheduler:
+    def __init__(self, min_interval: float = 1, max_interval: float = 5 * MIN, smoothing: float = 0.3) -> None:
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.smoothing = smoothing
+
+        self._reports: dict[str, float] = {}
+        self._cadences: dict[str, float] = {}
+
+        self.saved = 0
+
+    def observe(self, device_id: str, device: DeviceInfoResponse) -> None:
+        if not device.properties or any(item.type == EVENT_PROPERTY for item in device.properties):
+            self._cadences.pop(device_id, None)
+            return None
+
+        report = max(item.last_updated for item in device.properties)
+        previous = self._reports.get(device_id)
+        self._reports[device_id] = report
+        if previous is None or report <= previous:
+            return None
+
+        interval = report - previous
+        if (cadence := self._cadences.get(device_id)) is None:
+            self._cadences[device_id] = interval
+        else:
+            self._cadences[device_id] = cadence + self.smoothing * (interval - cadence)
+
+    def cadence(self, device_id: str) -> float | None:
+        return self._cadences.get(device_id)
+
+    def fresh_until(self, device_id: str) -> float | None:
+        if (cadence := self._cadences.get(device_id)) is None:
+            return None
+        return self._reports[device_id] + min(max(cadence, self.min_interval), self.max_interval)
+
+    def max_age(self, device_id: str, timestamp: float, max_age: float) -> float:
+        if (fresh_until := self.fresh_until(device_id)) is None or fresh_until - timestamp <= max_age:
+            return max_age
+        if max_age < time.time() - timestamp <= fresh_until - timestamp:
+            self.saved += 1
+        return fresh_until - timestamp
@@ -0,0 +1,29 @@
+import hmac
+
+from aiohttp import web
+from pydantic import ValidationError
+
+from smarthouse.yandex_client.client import YandexClient
+from smarthouse.yandex_client.models import StateCallback
+
+
+def push_routes(token: str, path: str = "/yandex/callback/state") -> web.RouteTableDef:
+    if not token:
+        raise ValueError("push callbacks require a token")
+    expected = f"Bearer {token}".encode()
+    routes = web.RouteTableDef()
+
+    @routes.post(path)
+    async def state_callback(request: web.Request):
+        if not hmac.compare_digest(request.headers.get("Authorization", "").encode(), expected):
+            raise web.HTTPForbidden()
+
+        try:
+            callback = StateCallback.model_validate(await request.json())
+        except (ValueError, ValidationError) as exc:
+            raise web.HTTPBadRequest(text=str(exc))
+
+        applied = YandexClient().apply_state_callback(callback)
+        return web.json_response({"status": "ok", "applied": applied})
+
+    return routes
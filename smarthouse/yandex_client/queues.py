@@ -0,0 +1,91 @@
+import asyncio
+import itertools
+import time
+from enum import IntEnum
+
+from smarthouse.base_client.histogram import Histogram
+
+
+class Lane(IntEnum):
+    interactive = 0
+    normal = 1
+    background = 2
+
+
+def supersedes(old_task: dict, task: dict) -> bool:
+    return task.get("lock") is None and old_task.get("lock_level", 0) <= task.get("lock_level", 0)
+
+
+class LanesQueue:
+    def __init__(self, supersede: bool = False) -> None:
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._counter = itertools.count()
+        self._supersede = supersede
+        self._pending: dict[str, dict] = {}
+        self._dead = 0
+
+        self.waits: dict[Lane, Histogram] = {lane: Histogram() for lane in Lane}
+        self.superseded = 0
+
+    async def put(self, task: dict, lane: Lane = Lane.normal) -> None:
+        if self._supersede:
+            if not task["actions"]:
+                return
+            self._supersede_pending(task)
+        await self._queue.put((lane, next(self._counter), time.time(), task))
+
+    def _supersede_pending(self, task: dict) -> None:
+        lock_level = task.get("lock_level", 0)
+        for action in task["actions"]:
+            old_task = self._pending.get(action.device_id)
+            if old_task is not None and old_task is not task and supersedes(old_task, task):
+                old_task["actions"] = [
+                    old_action for old_action in old_task["actions"] if old_action.device_id != action.device_id
+                ]
+                self.superseded += 1
+                if not old_task["actions"]:
+                    self._dead += 1
+                    self._queue.task_done()
+            if old_task is None or old_task.get("lock_level", 0) <= lock_level:
+                self._pending[action.device_id] = task
+
+    def _register(self, item: tuple) -> dict | None:
+        lane, _, enqueued, task = item
+        if self._supersede:
+            for action in task["actions"]:
+                if self._pending.get(action.device_id) is task:
+                    del self._pending[action.device_id]
+            if not task["actions"]:
+                self._dead -= 1
+                return None
+        self.waits[lane].add(time.time() - enqueued)
+        return task
+
+    async def get(self) -> dict:
+        while (task := self._register(await self._queue.get())) is None:
+            pass
+        return task
+
+    def get_nowait(self) -> dict:
+        while (task := self._register(self._queue.get_nowait())) is None:
+            pass
+        return task
+
+    def task_done(self) -> None:
+        self._queue.task_done()
+
+    async def join(self) -> None:
+        await self._queue.join()
+
+    def qsize(self) -> int:
+        return self._queue.qsize() - self._dead
+
+    def empty(self) -> bool:
+        return self.qsize() == 0
+
+    def waits_summary(self) -> dict[str, dict[str, float]]:
+        return {lane.name: histogram.summary() for lane, histogram in self.waits.items() if histogram.count}
+
+    def reset_waits(self) -> None:
+        for histogram in self.waits.values():
+            histogram.reset()
@@ -8,6 +8,7 @@ from typing import Optional
 import aioboto3
 import aiohttp
 import jwt
+from botocore.exceptions import ClientError
 
 from smarthouse.utils import Singleton
 
@@ -98,7 +99,18 @@ class YandexCloudClient(metaclass=Singleton):
         return await s3_ob["Body"].read()
 
     @retry
-    async def put_bucket(self, bucket: str, key: str, body: str):
+    async def bucket_has(self, bucket: str, key: str) -> bool:
+        async with self.boto_session.client(service_name="s3", endpoint_url=self.endpoint_url) as s3:
+            try:
+                await s3.head_object(Bucket=bucket, Key=key)
+            except ClientError as exc:
+                if exc.response["Error"]["Code"] in ("404", "NoSuchKey"):
+                    return False
+                raise
+        return True
+
+    @retry
+    async def put_bucket(self, bucket: str, key: str, body: str | bytes):
         async with self.boto_session.client(service_name="s3", endpoint_url=self.endpoint_url) as s3:
             await s3.put_object(Bucket=bucket, Key=key, Body=body)
 
@@ -35,6 +35,26 @@ def pytest_configure(config):
     asyncio.run(Storage().init(storage_name=None))
 
 
+@pytest_asyncio.fixture
+async def init_ya_client():
+    ya_client = YandexClient()
+    sessions = (ya_client.client, ya_client.china_client)
+    created = []
+
+    def init(**kwargs) -> YandexClient:
+        ya_client.init(prod=True, **kwargs)
+        created.extend((ya_client.client, ya_client.china_client))
+        return ya_client
+
+    try:
+        yield init
+    finally:
+        init()
+        for session in created:
+            await session.close()
+        ya_client.client, ya_client.china_client = sessions
+
+
 @pytest_asyncio.fixture(scope="session")
 async def ya_client_mock():
     mock = AsyncMock(spec=YandexClient)
@@ -0,0 +1,67 @@
+import asyncio
+import copy
+
+import pytest
+
+from smarthouse.yandex_client.client import YandexClient
+from smarthouse.yandex_client.device import MotionSensor
+from smarthouse.yandex_client.events import EventType, diff_device_info
+from smarthouse.yandex_client.models import DeviceInfoResponse
+from tests.conftest import get_lamp_response
+
+
+@pytest.mark.asyncio
+async def test_diff_device_info():
+    response = await get_lamp_response()
+    previous = DeviceInfoResponse(**response)
+    response["properties"][0]["last_updated"] += 10
+    response["properties"][1]["state"]["value"] = "opened"
+    response["capabilities"][2]["state"]["value"] = True
+    current = DeviceInfoResponse(**response)
+
+    events = diff_device_info(previous, current)
+    assert [(event.type, event.instance, event.value) for event in events] == [
+        (EventType.motion, "motion", "detected"),
+        (EventType.opened, "open", "opened"),
+        (EventType.capability, "on", True),
+    ]
+    assert diff_device_info(current, current) == []
+
+
+@pytest.mark.asyncio
+async def test_diff_device_info_instances():
+    response = await get_lamp_response()
+    volume = copy.deepcopy(response["capabilities"][0])
+    volume["parameters"]["instance"] = "volume"
+    volume["state"] = {"instance": "volume", "value": 10}
+    response["capabilities"].append(volume)
+    previous = DeviceInfoResponse(**response)
+    assert diff_device_info(previous, previous) == []
+
+    response["capabilities"][3]["state"]["value"] = 20
+    response["capabilities"][1]["state"] = {"instance": "hsv", "value": {"h": 0, "s": 0, "v": 100}}
+    events = diff_device_info(previous, DeviceInfoResponse(**response))
+    assert [(event.instance, event.value) for event in events] == [("hsv", {"h": 0, "s": 0, "v": 100}), ("volume", 20)]
+
+
+@pytest.mark.asyncio
+async def test_next_motion():
+    ya_client = YandexClient()
+    sensor = MotionSensor("events_motion_sensor", "Events motion sensor")
+    response = await get_lamp_response()
+    response["id"] = sensor.device_id
+    ya_client._on_device_info(sensor.device_id, DeviceInfoResponse(**response))
+
+    waiter = asyncio.create_task(sensor.next_motion(timeout=1))
+    await asyncio.sleep(0)
+    assert sensor.device_id in ya_client.events.watched()
+
+    response["properties"][1]["state"]["value"] = "opened"
+    ya_client._on_device_info(sensor.device_id, DeviceInfoResponse(**response))
+    response["properties"][0]["last_updated"] += 10
+    ya_client._on_device_info(sensor.device_id, DeviceInfoResponse(**response))
+
+    event = await waiter
+    assert event is not None and event.type == EventType.motion
+    assert sensor.device_id not in ya_client.events.watched()
+    assert await sensor.next_motion(timeout=0.01) is None
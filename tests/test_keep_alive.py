@@ -0,0 +1,18 @@
+import pytest
+
+from benchmarks.stand_in import StandIn
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("keep_alive, created", [(False, 5), (True, 1)])
+async def test_keep_alive(aiohttp_server, init_ya_client, keep_alive, created):
+    stand_in = StandIn(latency=0)
+    stand_in.add_lamp("lamp")
+    server = await aiohttp_server(stand_in.app())
+    ya_client = init_ya_client(keep_alive=keep_alive, warm_up_connections=1, base_url=str(server.make_url("")))
+    await ya_client.warm_up()
+    for _ in range(4 if keep_alive else 5):
+        await ya_client._request("GET", "/devices/lamp")
+
+    assert ya_client._connection_stats["created"] == created
+    assert ya_client._connection_stats["reused"] == (4 if keep_alive else 0)
@@ -0,0 +1,46 @@
+import asyncio
+import time
+
+import pytest
+
+from smarthouse.base_client.pinger import Pinger
+
+
+@pytest.mark.asyncio
+async def test_sweep():
+    pinger = Pinger(period=0.2, concurrency=3, spread=0.5)
+    active = 0
+    max_active = 0
+    started = []
+
+    async def probe(device_id):
+        nonlocal active, max_active
+        started.append(time.monotonic())
+        active += 1
+        max_active = max(max_active, active)
+        await asyncio.sleep(0.05)
+        active -= 1
+
+    device_ids = [f"device-{i}" for i in range(10)]
+    duration = await pinger.sweep(device_ids, probe, lambda device_id: device_id in ("device-0", "device-1"))
+
+    assert pinger.probed == 8
+    assert pinger.skipped == 2
+    assert max_active <= 3
+    assert started[-1] - started[0] >= 0.08
+    assert duration < 0.3
+
+
+@pytest.mark.asyncio
+async def test_sweep_errors():
+    pinger = Pinger(period=0, concurrency=2)
+    probed = []
+
+    async def probe(device_id):
+        probed.append(device_id)
+        if device_id == "device-1":
+            raise ValueError(device_id)
+
+    with pytest.raises(ValueError):
+        await pinger.sweep([f"device-{i}" for i in range(4)], probe, lambda device_id: False)
+    assert len(probed) == 4
@@ -0,0 +1,59 @@
+import time
+
+import pytest
+
+from smarthouse.yandex_client.client import YandexClient
+from smarthouse.yandex_client.models import DeviceInfoResponse
+from smarthouse.yandex_client.poll_scheduler import EVENT_PROPERTY, PollScheduler
+from tests.conftest import get_lamp_response
+
+
+async def get_sensor(last_updated: float, property_type: str = "devices.properties.float") -> DeviceInfoResponse:
+    response = await get_lamp_response()
+    for item in response["properties"]:
+        item["type"] = property_type
+        item["last_updated"] = last_updated
+    return DeviceInfoResponse(**response)
+
+
+@pytest.mark.asyncio
+async def test_cadence():
+    scheduler = PollScheduler(max_interval=100)
+    now = time.time()
+    for report in (now - 60, now - 60, now - 30, now):
+        scheduler.observe("lux", await get_sensor(report))
+    assert scheduler.cadence("lux") == 30
+    assert scheduler.fresh_until("lux") == now + 30
+
+    assert scheduler.max_age("lux", now, 1) == 30
+    assert scheduler.saved == 0
+    assert scheduler.max_age("lux", now - 5, 1) == 35
+    assert scheduler.saved == 1
+
+    for report in (now - 200, now - 170):
+        scheduler.observe("stale", await get_sensor(report))
+    assert scheduler.max_age("stale", now - 170, 1) == 30
+    assert scheduler.saved == 1
+
+    for report in (now - 30, now):
+        scheduler.observe("motion", await get_sensor(report, EVENT_PROPERTY))
+    assert scheduler.cadence("motion") is None
+    assert scheduler.max_age("motion", now - 5, 1) == 1
+
+
+@pytest.mark.asyncio
+async def test_adaptive_polling_cache(mocker):
+    ya_client = YandexClient()
+    now = time.time()
+    ya_client.adaptive_polling = True
+    try:
+        for report in (now - 25, now - 5):
+            ya_client.poll_scheduler.observe("humidity", await get_sensor(report))
+        ya_client._cache.set("humidity", await get_sensor(now - 5), timestamp=now - 5)
+        request = mocker.patch.object(ya_client, "_device_info_request")
+
+        assert await ya_client.device_info("humidity", hash_seconds=1) is not None
+        assert request.call_count == 0
+        assert ya_client.poll_scheduler.saved == 1
+    finally:
+        ya_client.adaptive_polling = False
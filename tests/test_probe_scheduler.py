@@ -0,0 +1,36 @@
+from smarthouse.base_client.probe_scheduler import ProbeScheduler
+
+
+def test_backoff():
+    scheduler = ProbeScheduler(base=10, max_delay=100, jitter=0.2, seed=0)
+    scheduler.sync(["a", "b"], now=0)
+    assert scheduler.due(now=5) == []
+    assert sorted(scheduler.due(now=12)) == ["a", "b"]
+
+    now = 12.0
+    for failures in range(1, 6):
+        scheduler.failed("a", now=now)
+        next_time = scheduler.next_time()
+        assert next_time is not None
+        delay = next_time - now
+        expected = min(100, 10 * 2**failures)
+        assert expected * 0.8 <= delay <= expected * 1.2
+        assert scheduler.due(now=now + delay) == ["a"]
+        now += delay
+
+    scheduler.recovered("a")
+    assert scheduler.failures("a") == 0
+    assert scheduler.next_time() is None
+    assert scheduler.recoveries == 1
+
+
+def test_sync():
+    scheduler = ProbeScheduler(base=10, jitter=0, seed=0)
+    scheduler.sync(["a", "b"], now=0)
+    scheduler.failed("a", now=10)
+    scheduler.sync(["a", "b"], now=20)
+    assert len(scheduler._heap) == 3
+
+    scheduler.sync(["b"], now=20)
+    assert len(scheduler) == 1
+    assert scheduler.due(now=100) == ["b"]
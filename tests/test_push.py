@@ -0,0 +1,91 @@
+import copy
+
+import pytest
+from aiohttp import web
+
+from smarthouse.yandex_client.client import YandexClient
+from smarthouse.yandex_client.events import EventType
+from smarthouse.yandex_client.models import DeviceInfoResponse, StateCallback
+from smarthouse.yandex_client.push import push_routes
+from tests.conftest import get_lamp_response
+
+
+@pytest.mark.asyncio
+async def test_state_callback(aiohttp_client):
+    ya_client = YandexClient()
+    response = await get_lamp_response()
+    response["id"] = "pushed_lamp"
+    ya_client._on_device_info("pushed_lamp", DeviceInfoResponse(**response))
+    subscription = ya_client.events.subscribe("pushed_lamp")
+
+    app = web.Application()
+    app.add_routes(push_routes("secret"))
+    client = await aiohttp_client(app)
+    callback = {
+        "ts": response["properties"][0]["last_updated"] + 1,
+        "payload": {
+            "devices": [
+                {
+                    "id": "pushed_lamp",
+                    "capabilities": [
+                        {"type": "devices.capabilities.on_off", "state": {"instance": "on", "value": True}}
+                    ],
+                    "properties": [
+                        {"type": "devices.properties.event", "state": {"instance": "motion", "value": "detected"}}
+                    ],
+                },
+                {"id": "unknown_device"},
+            ]
+        },
+    }
+    try:
+        assert (await client.post("/yandex/callback/state", json=callback)).status == 403
+        wrong = {"Authorization": "Bearer wrong"}
+        assert (await client.post("/yandex/callback/state", json=callback, headers=wrong)).status == 403
+        headers = {"Authorization": "Bearer secret"}
+        assert (await client.post("/yandex/callback/state", json={"ts": 1}, headers=headers)).status == 400
+
+        result = await client.post("/yandex/callback/state", json=callback, headers=headers)
+        assert (await result.json())["applied"] == 1
+        assert await ya_client.check_capability("pushed_lamp", "on_off", hash_seconds=30) is True
+        assert {(await subscription.get()).type, (await subscription.get()).type} == {
+            EventType.motion,
+            EventType.capability,
+        }
+    finally:
+        subscription.close()
+
+
+def test_push_routes_require_token():
+    with pytest.raises(ValueError):
+        push_routes("")
+
+
+@pytest.mark.asyncio
+async def test_state_callback_instances():
+    ya_client = YandexClient()
+    response = await get_lamp_response()
+    response["id"] = "pushed_speaker"
+    volume = copy.deepcopy(response["capabilities"][0])
+    volume["parameters"]["instance"] = "volume"
+    volume["state"] = {"instance": "volume", "value": 10}
+    response["capabilities"].append(volume)
+    ya_client._on_device_info("pushed_speaker", DeviceInfoResponse(**response))
+
+    callback = {
+        "ts": response["properties"][0]["last_updated"] + 1,
+        "payload": {
+            "devices": [
+                {
+                    "id": "pushed_speaker",
+                    "capabilities": [
+                        {"type": "devices.capabilities.range", "state": {"instance": "brightness", "value": 55}}
+                    ],
+                }
+            ]
+        },
+    }
+    assert ya_client.apply_state_callback(StateCallback.model_validate(callback)) == 1
+    capabilities = ya_client._cache.peek("pushed_speaker").value.capabilities
+    assert capabilities[0].state == {"instance": "brightness", "value": 55}
+    assert capabilities[3].state == {"instance": "volume", "value": 10}
@@ -0,0 +1,34 @@
+import time
+
+import pytest
+
+from smarthouse.base_client.rate_limiter import AdaptiveRateLimiter
+
+
+@pytest.mark.asyncio
+async def test_token_bucket():
+    limiter = AdaptiveRateLimiter(rate=100, burst=2)
+    start = time.monotonic()
+    for _ in range(5):
+        await limiter.acquire()
+
+    assert time.monotonic() - start >= 0.025
+    assert limiter.throttled == 3
+
+
+def test_aimd():
+    limiter = AdaptiveRateLimiter(rate=10, min_rate=2, cooldown=60)
+    limiter.on_failure()
+    limiter.on_failure()
+    assert limiter.rate == 5
+    assert limiter.failures == 2
+
+    limiter._decreased -= 60
+    limiter.on_failure()
+    limiter._decreased -= 60
+    limiter.on_failure()
+    assert limiter.rate == 2
+
+    for _ in range(100):
+        limiter.on_success()
+    assert limiter.rate == 10
@@ -0,0 +1,138 @@
+import asyncio
+import datetime
+import json
+
+import pytest
+
+from smarthouse.yandex_client.device import Action, RunQueuesSet, run_batch
+from smarthouse.yandex_client.queues import Lane, LanesQueue
+from tests.conftest import get_action_response
+from tests.test_yandex_client import MockResponse
+
+
+@pytest.mark.asyncio
+async def test_run_batch(mocker, device):
+    ITEM_UUID, DEVICE, ACTIONS_LIST = device
+    action_response = await get_action_response()
+    action_response["devices"][0]["id"] = ITEM_UUID
+    request = mocker.patch("aiohttp.ClientSession.request", return_value=MockResponse(action_response, 200))
+
+    tasks = [
+        {"actions": [Action(ITEM_UUID, "lamp", ()).add_capability(("on_off", "on", True))], "check": False},
+        {"actions": [Action("other_lamp", "lamp", ()).add_capability(("on_off", "on", True))], "check": False},
+        {"actions": [Action(ITEM_UUID, "lamp", ()).add_capability(("on_off", "on", False))], "check": False},
+    ]
+    merged = RunQueuesSet().merged
+    await run_batch(tasks)
+
+    assert request.call_count == 1
+    devices = json.loads(request.call_args.kwargs["data"])["devices"]
+    assert [device["id"] for device in devices] == ["other_lamp", ITEM_UUID]
+    assert devices[1]["actions"][0]["state"]["value"] is False
+    assert RunQueuesSet().merged == merged + 1
+
+
+@pytest.mark.asyncio
+async def test_run_batch_keeps_locked(mocker, device):
+    ITEM_UUID, DEVICE, ACTIONS_LIST = device
+    action_response = await get_action_response()
+    action_response["devices"][0]["id"] = ITEM_UUID
+    request = mocker.patch("aiohttp.ClientSession.request", return_value=MockResponse(action_response, 200))
+
+    tasks = [
+        {
+            "actions": [Action(ITEM_UUID, "lamp", ()).add_capability(("on_off", "on", True))],
+            "check": False,
+            "lock_level": 1,
+            "lock": datetime.timedelta(minutes=5),
+        },
+        {"actions": [Action(ITEM_UUID, "lamp", ()).add_capability(("on_off", "on", False))], "check": False},
+    ]
+    merged = RunQueuesSet().merged
+    await run_batch(tasks)
+
+    devices = [json.loads(call.kwargs["data"])["devices"] for call in request.call_args_list]
+    assert devices[0][0]["actions"][0]["state"]["value"] is True
+    assert not any(devices[1:])
+    assert RunQueuesSet().merged == merged
+
+
+@pytest.mark.asyncio
+async def test_lanes_queue():
+    queue = LanesQueue()
+    await queue.put({"name": "background_1"}, Lane.background)
+    await queue.put({"name": "normal"})
+    await queue.put({"name": "background_2"}, Lane.background)
+    await queue.put({"name": "interactive"}, Lane.interactive)
+
+    names = [(await queue.get())["name"] for _ in range(4)]
+    assert names == ["interactive", "normal", "background_1", "background_2"]
+    assert queue.empty()
+
+    waits = queue.waits_summary()
+    assert waits["interactive"]["count"] == 1
+    assert waits["background"]["count"] == 2
+    queue.reset_waits()
+    assert queue.waits_summary() == {}
+
+
+@pytest.mark.asyncio
+async def test_lanes_queue_supersede():
+    queue = LanesQueue(supersede=True)
+    await queue.put({"actions": [Action("lamp", "lamp", ()), Action("other", "lamp", ())], "lock_level": 0})
+    await queue.put({"actions": [Action("locked", "lamp", ())], "lock_level": 5})
+    await queue.put({"actions": [Action("lamp", "lamp", ()), Action("locked", "lamp", ())], "lock_level": 0})
+
+    first = await queue.get()
+    second = await queue.get()
+    third = await queue.get()
+    assert [action.device_id for action in first["actions"]] == ["other"]
+    assert [action.device_id for action in second["actions"]] == ["locked"]
+    assert [action.device_id for action in third["actions"]] == ["lamp", "locked"]
+    assert queue.superseded == 1
+
+    await queue.put({"actions": [Action("lamp", "lamp", ())]})
+    await queue.put({"actions": [Action("lamp", "lamp", ())]})
+    assert queue.get_nowait()["actions"][0].device_id == "lamp"
+    assert queue.empty()
+    assert queue.superseded == 2
+
+
+@pytest.mark.asyncio
+async def test_lanes_queue_supersede_across_lanes():
+    queue = LanesQueue(supersede=True)
+    await queue.put({"actions": [Action("lamp", "lamp", ())]}, Lane.background)
+    await queue.put({"actions": [Action("lamp", "lamp", ())]}, Lane.interactive)
+    assert queue.qsize() == 1
+
+    tasks = [await queue.get()]
+    while not queue.empty():
+        tasks.append(queue.get_nowait())
+    assert len(tasks) == 1
+    assert queue.qsize() == 0
+    with pytest.raises(asyncio.QueueEmpty):
+        queue.get_nowait()
+
+    for _ in tasks:
+        queue.task_done()
+    await asyncio.wait_for(queue.join(), 1)
+
+
+@pytest.mark.asyncio
+async def test_worker_run_batch_failure(mocker):
+    from smarthouse.scenarios.light_scenarios import worker_run_batch
+
+    run_batch_mock = mocker.patch("smarthouse.scenarios.light_scenarios.run_batch", side_effect=ValueError())
+    RunQueuesSet().init()
+    run_queue = RunQueuesSet().run
+    try:
+        await run_queue.put({"actions": [Action("lamp", "lamp", ())]}, Lane.background)
+        await run_queue.put({"actions": [Action("lamp", "lamp", ())]}, Lane.interactive)
+        await run_queue.put({"actions": [Action("other", "lamp", ())]})
+
+        worker = asyncio.create_task(worker_run_batch())
+        await asyncio.wait_for(run_queue.join(), 1)
+        worker.cancel()
+        assert len(run_batch_mock.call_args.args[0]) == 2
+    finally:
+        RunQueuesSet().init()
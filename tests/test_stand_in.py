@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from benchmarks.stand_in import StandIn
+from smarthouse.scenarios.light_scenarios import ping_devices
+from smarthouse.scenarios.system_scenarios import detect_human
+from smarthouse.yandex_client.models import DeviceCapabilityAction, StateItem
+
+
+@pytest_asyncio.fixture
+async def stand_in(aiohttp_server, init_ya_client):
+    stand_in = StandIn(latency=0, seed=0)
+    stand_in.add_lamp("lamp_1")
+    stand_in.add_lamp("lamp_2")
+    stand_in.add_sensor("sensor", {"motion": "detected", "illumination": 100})
+    stand_in.add_group("group", ["lamp_1", "lamp_2"])
+    stand_in.add_scenario(
+        "scenario", [("lamp_2", [{"type": "devices.capabilities.on_off", "state": {"instance": "on", "value": True}}])]
+    )
+    server = await aiohttp_server(stand_in.app())
+
+    ya_client = init_ya_client(base_url=str(server.make_url("")))
+    for device_id in stand_in.devices:
+        ya_client.register_device(device_id, device_id)
+    return stand_in, ya_client
+
+
+@pytest.mark.asyncio
+async def test_stand_in_actions(stand_in):
+    stand_in, ya_client = stand_in
+    assert await ya_client.check_capability("lamp_1", "on_off") is False
+    assert (await ya_client.check_property("sensor", "illumination"))[0] == 100
+
+    await ya_client.change_devices_capabilities(
+        [DeviceCapabilityAction(device_id="lamp_1", capabilities=[("on_off", "on", True)])]
+    )
+    assert stand_in.capability("lamp_1", "devices.capabilities.on_off")["value"] is True
+    assert await ya_client.check_capability("lamp_1", "on_off", hash_seconds=None) is True
+
+    await ya_client.run_scenario("scenario")
+    assert stand_in.capability("lamp_2", "devices.capabilities.on_off")["value"] is True
+    assert [device["id"] for device in (await ya_client.group_info("group"))["devices"]] == ["lamp_1", "lamp_2"]
+    assert len((await ya_client.info(hash_seconds=None))["devices"]) == 3
+    assert stand_in.calls["POST /v1.0/devices/actions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stand_in_faults(stand_in):
+    stand_in, ya_client = stand_in
+    stand_in.inject("/v1.0/devices/lamp_1", 500, count=2)
+    assert await ya_client.device_info("lamp_1") is not None
+    assert stand_in.calls["GET /v1.0/devices/{device_id}"] == 3
+
+    stand_in.offline.add("lamp_2")
+    assert await ya_client.device_info("lamp_2") is None
+    assert ya_client.quarantine_in("lamp_2")
+
+    assert await ya_client.device_info("missing") is None
+    assert ya_client.quarantine_in("missing")
+
+
+@pytest.mark.asyncio
+async def test_detect_human(stand_in):
+    stand_in, ya_client = stand_in
+    action = DeviceCapabilityAction(device_id="lamp_1", capabilities=[("on_off", "on", False)])
+    ya_client.states_set("lamp_1", StateItem(actions_list=[action], excl=(), checked=True))
+    await detect_human._original()
+    assert ya_client._suspects == {}
+
+    stand_in.calls.clear()
+    await detect_human._original()
+    assert dict(stand_in.calls) == {"GET /v1.0/user/info": 1}
+
+    stand_in.capability("lamp_1", "devices.capabilities.on_off")["value"] = True
+    await detect_human._original()
+    assert list(ya_client._suspects) == ["lamp_1"]
+    assert not ya_client.locks_in("lamp_1")
+
+    ya_client._suspects["lamp_1"] = (0, ya_client._suspects["lamp_1"][1])
+    await detect_human._original()
+    assert ya_client._suspects == {}
+    assert ya_client.locks_get("lamp_1").level == 10
+
+
+@pytest.mark.asyncio
+async def test_ping_devices_seeds_fresh_states(stand_in):
+    stand_in, ya_client = stand_in
+    await detect_human._original()
+    assert not list(ya_client.states_keys())
+
+    stand_in.calls.clear()
+    await ping_devices._original()
+    assert ya_client.pinger.probed == 0
+    assert set(ya_client.states_keys()) == set(stand_in.devices) - {"group"}
+    assert not stand_in.calls
+
+
+@pytest.mark.asyncio
+async def test_refresh_snapshot_in_flight(stand_in, mocker):
+    stand_in, ya_client = stand_in
+    response = await ya_client.info(hash_seconds=None)
+    released = asyncio.Event()
+
+    async def info(*args, **kwargs):
+        await released.wait()
+        return response
+
+    mocker.patch.object(ya_client, "info", side_effect=info)
+    refresh = asyncio.create_task(ya_client.refresh_snapshot())
+    await asyncio.sleep(0)
+    await ya_client.change_devices_capabilities(
+        [DeviceCapabilityAction(device_id="lamp_1", capabilities=[("on_off", "on", True)])], check=False
+    )
+    released.set()
+    await refresh
+
+    assert await ya_client.check_capability("lamp_1", "on_off") is True
+    assert ya_client.last_get("lamp_2")[0] is ya_client._cache.peek("lamp_2").value
@@ -0,0 +1,49 @@
+import time
+
+from smarthouse.base_client.state_cache import StateCache
+
+
+def test_max_age():
+    cache: StateCache[int] = StateCache()
+    cache.set("device", 1, time.time() - 2)
+
+    assert cache.get("device", 1) is None
+    assert cache.get("device", 5) == 1
+    assert cache.get("device", None) is None
+    assert cache.get("unknown", 5) is None
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+def test_eviction():
+    cache: StateCache[int] = StateCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a", 10)
+    cache.set("c", 3)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert cache.evictions == 1
+
+
+def test_invalidate_generation():
+    cache: StateCache[int] = StateCache()
+    generation = cache.generation("device")
+    cache.invalidate("device")
+    cache.set("device", 1, generation=generation)
+
+    assert "device" not in cache
+
+    cache.set("device", 2, generation=cache.generation("device"))
+    assert cache.get("device", 10) == 2
+
+    other = cache.generation("other")
+    for i in range(2000):
+        cache.invalidate(f"device_{i}")
+    assert len(cache._invalidated) == 1024
+    cache.set("other", 1, generation=other)
+    assert "other" not in cache
+    cache.set("device_1999", 1, generation=other)
+    assert "device_1999" not in cache
+    cache.set("other", 2, generation=cache.generation("other"))
+    assert cache.get("other", 10) == 2
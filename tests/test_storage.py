@@ -0,0 +1,150 @@
+import gzip
+import json
+import os
+import sqlite3
+
+import pytest
+import yaml
+
+from smarthouse.storage import Storage
+from smarthouse.storage_backends import JsonGzFormat, MsgpackFormat, StorageError, YamlFormat, get_format, make_backend
+
+
+@pytest.fixture
+def storage_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.mkdir("storage")
+    with open("storage/storage.yaml", "w", encoding="utf-8") as f:
+        f.write(yaml.dump({"a": 1, "b": {"c": [1, 2]}, "__tmp": 1}))
+    return tmp_path
+
+
+@pytest.mark.asyncio
+async def test_journal(storage_dir):
+    storage = Storage()
+    await storage.init(storage_name="storage.yaml", backend="journal")
+    try:
+        assert dict(storage.items()) == {"a": 1, "b": {"c": [1, 2]}}
+        assert not os.path.exists("storage/storage.yaml.journal")
+
+        storage.put("a", 2)
+        storage.put("d", [1, 2])
+        storage.delete("b")
+        await storage._write_storage()
+        await storage._write_storage()
+        storage.put("a", 3)
+        await storage._write_storage()
+        assert storage._backend.writes == 2
+
+        with open("storage/storage.yaml.journal", "a", encoding="utf-8") as f:
+            f.write("---\nset:\n  a: 4\n")
+
+        await storage.init(storage_name="storage.yaml", backend="journal")
+        assert dict(storage.items()) == {"a": 3, "d": [1, 2]}
+        assert not os.path.exists("storage/storage.yaml.journal")
+        with open("storage/storage.yaml", encoding="utf-8") as f:
+            assert yaml.safe_load(f) == {"a": 3, "d": [1, 2]}
+    finally:
+        await storage.init(storage_name=None)
+
+
+@pytest.mark.asyncio
+async def test_journal_compaction(storage_dir):
+    storage = Storage()
+    await storage.init(storage_name="storage.yaml", backend="journal")
+    try:
+        storage._backend.min_compact_size = 0
+        storage.put("a", 2)
+        await storage._write_storage()
+        await storage._backend._compaction
+        assert storage._backend.compactions == 2
+        assert not os.path.exists("storage/storage.yaml.journal")
+        assert not os.path.exists("storage/storage.yaml.journal.old")
+        with open("storage/storage.yaml", encoding="utf-8") as f:
+            assert yaml.safe_load(f)["a"] == 2
+    finally:
+        await storage.init(storage_name=None)
+
+
+@pytest.mark.asyncio
+async def test_format_migration(storage_dir):
+    storage = Storage()
+    await storage.init(storage_name="storage.json.gz")
+    try:
+        assert isinstance(storage._backend.format, JsonGzFormat)
+        assert dict(storage.items()) == {"a": 1, "b": {"c": [1, 2]}}
+        assert os.path.exists("storage/storage.yaml.migrated")
+        assert not os.path.exists("storage/storage.yaml")
+
+        storage.put("a", 2)
+        await storage._write_storage()
+        with gzip.open("storage/storage.json.gz") as f:
+            assert json.load(f) == {"a": 2, "b": {"c": [1, 2]}}
+    finally:
+        await storage.init(storage_name=None)
+
+    assert isinstance(get_format("storage.yaml", "msgpack"), MsgpackFormat)
+    assert isinstance(get_format("storage.msgpack"), MsgpackFormat)
+    assert isinstance(get_format("storage"), YamlFormat)
+
+    for backend in ("journal", "sqlite"):
+        with pytest.raises(StorageError):
+            make_backend("storage.yaml", s3_mode=True, backend=backend)
+
+
+@pytest.mark.asyncio
+async def test_sqlite(storage_dir):
+    storage = Storage()
+    await storage.init(storage_name="storage.sqlite", backend="sqlite")
+    try:
+        assert dict(storage.items()) == {"a": 1, "b": {"c": [1, 2]}}
+        assert os.path.exists("storage/storage.yaml.migrated")
+
+        storage.put("a", {1: "one"})
+        storage.delete("b")
+        await storage._write_storage()
+        assert storage._backend.stats()["writes"] == 2
+        assert storage._backend.stats()["bytes_written"] < 20
+
+        await storage.init(storage_name="storage.sqlite", backend="sqlite")
+        assert dict(storage.items()) == {"a": {1: "one"}}
+        connection = sqlite3.connect("storage/storage.sqlite")
+        assert connection.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+        assert connection.execute("SELECT key FROM storage").fetchall() == [("a",)]
+        connection.close()
+    finally:
+        await storage.init(storage_name=None)
+
+
+@pytest.mark.asyncio
+async def test_transaction(storage_dir):
+    storage = Storage()
+    await storage.init(storage_name="storage.yaml", backend="journal")
+    try:
+        with storage.transaction() as transaction:
+            transaction.put("a", 2)
+            transaction.put("d", 3)
+            transaction.delete("b")
+            assert transaction.get("a") == 2
+            assert transaction.get("b", None) is None
+            assert storage.get("a") == 1
+            assert "b" in storage.keys()
+        assert storage._dirty == {"a", "b", "d"}
+        assert dict(storage.items()) == {"a": 2, "d": 3}
+
+        with pytest.raises(ValueError):
+            with storage.transaction() as transaction:
+                transaction.put("a", 5)
+                raise ValueError()
+        assert storage.get("a") == 2
+
+        storage.put("e", 1, shadow=True)
+        storage.put("a", 2, shadow=True)
+        storage.write_shadow()
+        assert storage._dirty == {"a", "b", "d", "e"}
+
+        await storage._write_storage()
+        assert not storage._dirty
+        assert storage._backend.writes == 1
+    finally:
+        await storage.init(storage_name=None)
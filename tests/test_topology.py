@@ -0,0 +1,78 @@
+import pytest
+import pytest_asyncio
+
+from benchmarks.stand_in import StandIn
+from smarthouse.base_client.topology import Topology
+from smarthouse.scenarios.system_scenarios import clear_quarantine
+
+
+def test_topology():
+    topology = Topology(threshold=2, ratio=0.5)
+    for i in range(4):
+        topology.add(f"lamp_{i}", "hub")
+    topology.add("sensor", "other")
+
+    assert topology.update({"lamp_0", "sensor"}) == {}
+    assert topology.update({"lamp_0", "lamp_3", "sensor"}) == {"hub": {"lamp_0", "lamp_3"}}
+    assert topology.update({"lamp_0", "lamp_1", "lamp_3"}) == {"hub": {"lamp_0", "lamp_1", "lamp_3"}}
+    assert topology.outages == 1
+    assert topology.representative({"lamp_3", "lamp_1"}) == "lamp_1"
+    assert topology.alternate("hub", {"lamp_0", "lamp_1", "lamp_3"}) == "lamp_1"
+    assert topology.alternate("hub", {"lamp_0", "lamp_1", "lamp_3"}) == "lamp_3"
+    assert topology.alternate("hub", {"lamp_0", "lamp_1", "lamp_3"}) == "lamp_1"
+    assert topology.alternate("hub", {"lamp_0"}) is None
+
+    topology.add("lamp_3", "other")
+    assert topology.members("hub") == {"lamp_0", "lamp_1", "lamp_2"}
+
+
+@pytest_asyncio.fixture
+async def hub(aiohttp_server, init_ya_client):
+    stand_in = StandIn(latency=0, seed=0)
+    server = await aiohttp_server(stand_in.app())
+
+    ya_client = init_ya_client(base_url=str(server.make_url("")))
+    for i in range(4):
+        stand_in.add_lamp(f"lamp_{i}")
+        ya_client.register_device(f"lamp_{i}", f"lamp_{i}", hub="hub")
+    return stand_in, ya_client
+
+
+@pytest.mark.asyncio
+async def test_hub_quarantine(hub):
+    stand_in, ya_client = hub
+    stand_in.offline.update(stand_in.devices)
+    for device_id in stand_in.devices:
+        assert await ya_client.device_info(device_id) is None
+    assert ya_client.quarantine_ids() == set(stand_in.devices)
+
+    ya_client.probe_scheduler.base = 0
+    stand_in.calls.clear()
+    await clear_quarantine._original()
+    assert ya_client.topology.down() == {"hub": set(stand_in.devices)}
+    assert sum(stand_in.calls.values()) == 1
+    assert len(ya_client.probe_scheduler) == 1
+
+    stand_in.offline.clear()
+    await clear_quarantine._original()
+    assert ya_client.quarantine_ids() == set()
+    assert ya_client.probe_scheduler.recoveries == 4
+
+
+@pytest.mark.asyncio
+async def test_hub_quarantine_dead_representative(hub):
+    stand_in, ya_client = hub
+    stand_in.offline.update(stand_in.devices)
+    for device_id in stand_in.devices:
+        assert await ya_client.device_info(device_id) is None
+
+    ya_client.probe_scheduler.base = 0
+    await clear_quarantine._original()
+    assert ya_client.topology.down() == {"hub": set(stand_in.devices)}
+
+    stand_in.offline.clear()
+    stand_in.offline.add("lamp_0")
+    for _ in range(5):
+        await clear_quarantine._original()
+    assert ya_client.quarantine_ids() == {"lamp_0"}
+    assert ya_client.topology.down() == {}
@@ -1,3 +1,5 @@
+import asyncio
+import copy
 import datetime
 import time
 from unittest import mock
@@ -8,7 +10,7 @@ import pytest
 
 from smarthouse.base_client.exceptions import InfraCheckError
 from smarthouse.yandex_client.client import YandexClient
-from smarthouse.yandex_client.models import Action, Device, DeviceCapabilityAction, StateItem
+from smarthouse.yandex_client.models import Action, Device, DeviceCapabilityAction, DeviceInfoResponse, StateItem
 from tests.conftest import get_action_response, get_lamp_response
 
 
@@ -343,3 +345,137 @@ async def test_locks(mocker, device):
         == []
     )
     assert ya_client.states_get(ITEM_UUID).actions_list == ACTIONS_LIST
+
+
+@pytest.mark.asyncio
+async def test_snapshot(mocker, device):
+    ITEM_UUID, DEVICE, ACTIONS_LIST = device
+    ya_client = YandexClient()
+    ya_client.register_device(ITEM_UUID, "Snapshot lamp")
+    lamp_response = await get_lamp_response()
+    lamp_response["id"] = ITEM_UUID
+    lamp_response.pop("state")
+    lamp_response.pop("status")
+    lamp_response.pop("request_id")
+    resp = MockResponse({"status": "ok", "request_id": "1", "devices": [lamp_response]}, 200)
+    mocker.patch("aiohttp.ClientSession.request", return_value=resp)
+
+    ya_client.snapshot_mode = True
+    try:
+        await ya_client.refresh_snapshot()
+        assert ITEM_UUID in ya_client._cache
+
+        mocker.patch("aiohttp.ClientSession.request", return_value=MockResponse({}, 500))
+        assert await ya_client.check_capability(ITEM_UUID, "on_off") is False
+        assert not ya_client.quarantine_in(ITEM_UUID)
+        assert ya_client._calls_get[ITEM_UUID] == 0
+    finally:
+        ya_client.snapshot_mode = False
+
+
+@pytest.mark.asyncio
+async def test_device_info_coalescing(mocker, base_client):
+    device_id = "coalesced_device"
+    lamp_response = await get_lamp_response()
+
+    async def slow_device_info(*args, **kwargs):
+        await asyncio.sleep(0.01)
+        return DeviceInfoResponse(**lamp_response)
+
+    mocker.patch.object(base_client, "_device_info", side_effect=slow_device_info)
+
+    results = await asyncio.gather(*[base_client.device_info(device_id=device_id) for _ in range(5)])
+
+    assert all(result is results[0] for result in results)
+    assert base_client._coalesced[device_id] == 4
+    assert not base_client._inflight
+    assert base_client._device_info.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_device_info_coalescing_leader_cancelled(mocker, base_client):
+    device_id = "cancelled_leader_device"
+    lamp_response = await get_lamp_response()
+
+    async def slow_device_info(*args, **kwargs):
+        await asyncio.sleep(0.05)
+        return DeviceInfoResponse(**lamp_response)
+
+    mocker.patch.object(base_client, "_device_info", side_effect=slow_device_info)
+
+    leader = asyncio.create_task(base_client.device_info(device_id=device_id))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(base_client.device_info(device_id=device_id))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    assert (await follower).id == lamp_response["id"]
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    assert not base_client._inflight
+    assert not base_client._waiters
+    assert base_client._device_info.call_count == 1
+
+    mocker.patch.object(base_client, "_device_info", side_effect=slow_device_info)
+    lone = asyncio.create_task(base_client.device_info(device_id="lone_device"))
+    await asyncio.sleep(0.01)
+    lone.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await lone
+    await asyncio.sleep(0)
+    assert not base_client._inflight
+    assert not base_client._waiters
+
+
+@pytest.mark.asyncio
+async def test_optimistic_device_info_instances():
+    ya_client = YandexClient()
+    lamp_response = await get_lamp_response()
+    volume = copy.deepcopy(lamp_response["capabilities"][0])
+    volume["parameters"]["instance"] = "volume"
+    volume["state"] = {"instance": "volume", "value": 10}
+    lamp_response["capabilities"].append(volume)
+    ya_client.last_set("optimistic_lamp", DeviceInfoResponse(**lamp_response))
+
+    device_info = ya_client.optimistic_device_info(
+        DeviceCapabilityAction(
+            device_id="optimistic_lamp", capabilities=[("range", "brightness", 30), ("color_setting", "hsv", [1, 2, 3])]
+        )
+    )
+    assert device_info.capabilities[0].state == {"instance": "brightness", "value": 30}
+    assert device_info.capabilities[1].state == {"instance": "hsv", "value": [1, 2, 3]}
+    assert device_info.capabilities[3].state == {"instance": "volume", "value": 10}
+
+
+@pytest.mark.asyncio
+async def test_write_through(mocker, device):
+    ITEM_UUID, DEVICE, ACTIONS_LIST = device
+    ya_client = YandexClient()
+    lamp_response = await get_lamp_response()
+    lamp_response["id"] = ITEM_UUID
+    mocker.patch("aiohttp.ClientSession.request", return_value=MockResponse(lamp_response, 200))
+    assert await ya_client.check_capability(ITEM_UUID, "on_off") is False
+
+    action_response = await get_action_response()
+    action_response["devices"][0]["id"] = ITEM_UUID
+    request = mocker.patch("aiohttp.ClientSession.request", return_value=MockResponse(action_response, 200))
+
+    ya_client.write_through = True
+    try:
+        await ya_client.change_devices_capabilities(ACTIONS_LIST)
+
+        assert request.call_count == 1
+        assert await ya_client.check_capability(ITEM_UUID, "on_off") is True
+        assert request.call_count == 1
+        assert ya_client._cache.peek(ITEM_UUID).optimistic
+        assert ya_client._reconcile_queue.qsize() == 1
+        assert ya_client.states_get(ITEM_UUID).checked is False
+
+        lamp_response["capabilities"][2]["state"]["value"] = True
+        mocker.patch("aiohttp.ClientSession.request", return_value=MockResponse(lamp_response, 200))
+        await ya_client.reconcile(**ya_client._reconcile_queue.get_nowait())
+
+        assert not ya_client._cache.peek(ITEM_UUID).optimistic
+        assert ya_client.states_get(ITEM_UUID).checked is True
+    finally:
+        ya_client.write_through = False